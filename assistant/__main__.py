@@ -1,7 +1,10 @@
 import os
 import sys
+import atexit
 
 from .assistant import Assistant
+from .nlp.grammar import write_usage
+from .utils import diagnostics, metrics
 
 
 def main():
@@ -12,6 +15,14 @@ def main():
     except IndexError:
         name = "friday"
 
+    if os.environ.get("ASSISTANT_DEBUG"):
+        diagnostics.enable()
+
+    # write dispatch timings and other statistics on shutdown, and
+    # expression usage the intent matchers learned their order from
+    atexit.register(metrics.dump)
+    atexit.register(write_usage)
+
     print(f"*** Activating assistant {name}***")
 
     assistant = Assistant(name=name, on_server=on_server)
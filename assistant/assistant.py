@@ -1,13 +1,12 @@
 #!/usr/bin/env python3
 
-import os
 import time
 import requests
-import random
 import traceback
 import yaml
 import threading
 
+from assistant.modules import audio
 from assistant.modules.snowboy import snowboydecoder
 from assistant.nlp import NaturalLanguageProcessor
 from assistant.skills import Skills
@@ -15,6 +14,7 @@ from assistant.modules.notifier import Notifier
 
 from assistant.interfaces import VoiceInterface, TelegramBot, WebAPI
 from assistant.utils import (
+    metrics,
     colored,
     os_is_raspbian,
     device_is_charging,
@@ -56,9 +56,12 @@ class Assistant(object):
             audio_gain=1,
         )
         self.detector_locked = False
+        # skill calls of the current voice session
+        self._voice_tasks = []
 
         # initialize componets
-        self.nlp = NaturalLanguageProcessor()
+        self.role = "server" if on_server else "pc"
+        self.nlp = NaturalLanguageProcessor(scope=("voice", self.role))
         self.skills = Skills(self)
         self.notifier = Notifier()
 
@@ -99,7 +102,9 @@ class Assistant(object):
                 "assistant/custom/call_responds/"
                 + self.personality["responds_folder"]
             )
-            self.response_filenames = os.listdir(path)
+            # decoded once, so that the response plays right away
+            self.responses = audio.ClipBank(path)
+            metrics.register("call_responds", self.responses.info)
 
     def _set_ecosystem(self):
         with open("assistant/custom/ecosystem_config.yaml") as file:
@@ -156,9 +161,15 @@ class Assistant(object):
     def fast_assist(self, text):
         """Process NL text if it has enough information (is_complete)."""
         for struct in self.nlp.structs(text):
-            if struct.is_complete() and struct not in self.nlp.completed:
-                self.skills.handle(text_struct=struct, interface=self.voice)
-                self.nlp.completed.append(struct)
+            if struct in self.nlp.completed:
+                continue
+            if struct.is_complete():
+                task = self.skills.handle(struct, interface=self.voice)
+                self._voice_tasks.append(task)
+                self.nlp.completed.add(struct)
+            else:
+                # let the skill start side-effect free work in advance
+                self.skills.prepare(struct, self.voice)
 
     def final_assist(self, text):
         """Process NL text even if it does not contain
@@ -166,21 +177,22 @@ class Assistant(object):
         """
         for struct in self.nlp.structs(text):
             if struct not in self.nlp.completed:
-                self.skills.handle(text_struct=struct, interface=self.voice)
-                self.nlp.completed.append(struct)
+                task = self.skills.handle(struct, interface=self.voice)
+                self._voice_tasks.append(task)
+                self.nlp.completed.add(struct)
         self.nlp.previous = self.nlp.completed
-        self.nlp.completed = []
+        self.nlp.completed = set()
+        self.skills.reset_speculation(self.voice)
 
     def _respond(self):
         """Play a random pre-recorded voice response from
         call_responds folder when assistant is called by keyword.
         """
-        path = (
-            "assistant/custom/call_responds/"
-            + self.personality["responds_folder"]
-        )
-        response_file = random.choice(self.response_filenames)
-        os.system(f"mpg123 {path}/{response_file}")
+        response = self.responses.choice()
+        if response is not None:
+            # being called stops whatever the assistant was saying
+            audio.engine.interrupt()
+            audio.engine.play(response, audio.ACKNOWLEDGEMENT)
 
     @wrappers.wrap_listen
     def _listen(self):
@@ -188,6 +200,7 @@ class Assistant(object):
         natural language processor when assistant is called.
         """
         self.detector_locked = True
+        self._voice_tasks = []
         # let the speech recognizer use the microphone
         if self._keyword_detector_active:
             self.detector.terminate()
@@ -199,6 +212,12 @@ class Assistant(object):
             self.notifier.close()
             self.voice.output("Error occured.")
 
+        # skills may still speak or ask for input, the microphone and
+        # the speaker are theirs until they return
+        for task in self._voice_tasks:
+            if task is not None:
+                task.finished.wait()
+
         # if listener was active then activate it
         if self._keyword_detector_active:
             self.detector.start(self._on_call)
@@ -207,7 +226,8 @@ class Assistant(object):
     def _on_call(self):
         """Function to call when assistant is called by voice."""
         threading.Timer(interval=0.4, function=self._listen).start()
-        threading.Thread(target=self._respond).start()
+        # only queues the response
+        self._respond()
 
     def _manage_power_saving(self):
         """Turn off keyword detector when device
@@ -232,7 +252,11 @@ class Assistant(object):
     @wrappers.wrap_run
     def run(self):
         """Run assistant threads."""
-        targets = [self.web_api.run]
+        targets = [
+            self.web_api.run,
+            self.skills.watch,
+            self.responses.watch,
+        ]
 
         if self._voice_activation:
             targets.append(self._activate_keyword_detector)
@@ -12,6 +12,7 @@ from telegram.ext import (
     Filters,
 )
 
+from assistant.nlp import NaturalLanguageProcessor
 from assistant.utils import colored
 
 from assistant.custom.telegram_config import (
@@ -56,9 +57,34 @@ def allowed_users_only(func):
     return wrapper
 
 
+class Chat(object):
+    """Telegram bot bound to one chat, so that a skill answers the chat
+    it was called from even if other chats write meanwhile.
+    """
+
+    # see utils.CAPABILITIES
+    kind = "chatbot"
+
+    def __init__(self, bot, chat_id):
+        self.bot = bot
+        self.chat_id = chat_id
+
+    def __getattr__(self, name):
+        return getattr(self.bot, name)
+
+    def input(self, text, regex=None):
+        return self.bot.input(text, regex=regex, chat_id=self.chat_id)
+
+    def output(self, text, prob=1):
+        self.bot.output(text, chat_id=self.chat_id, prob=prob)
+
+
 class TelegramBot(Updater):
     """Telegram bot interface."""
 
+    # see utils.CAPABILITIES
+    kind = "chatbot"
+
     def __init__(
         self,
         assistant,
@@ -71,7 +97,8 @@ class TelegramBot(Updater):
         self.assistant = assistant
         self.admin_id = allowed_users["admin"]
         self.users = allowed_users
-        self.nlp = assistant.nlp
+        # only intents of skills that can answer in a chat
+        self.nlp = NaturalLanguageProcessor(scope=(self.kind, assistant.role))
 
     @property
     def last_id(self):
@@ -118,14 +145,16 @@ class TelegramBot(Updater):
         either assume the lacking information or do nothing.
         """
 
+        # skills run on the skills executor, answering this chat
+        chat = Chat(self, self.last_id)
         for struct in self.nlp.structs(text):
             if struct not in self.nlp.completed:
                 self.assistant.skills.handle(
-                    text_struct=struct, interface=self
+                    text_struct=struct, interface=chat
                 )
-                self.nlp.completed.append(struct)
+                self.nlp.completed.add(struct)
         self.nlp.previous = self.nlp.completed
-        self.nlp.completed = []
+        self.nlp.completed = set()
 
     def _describe_message(self, update):
         name = colored(
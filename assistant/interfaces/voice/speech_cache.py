@@ -0,0 +1,151 @@
+"""Cache of synthesized speech.
+
+Audio is stored by a hash of (voice, format, text) in memory and on disk,
+so replies said before, like greetings and errors, do not go to Polly
+again. Both tiers are bounded in bytes and evict the least recently used
+clips, disk files are written atomically and survive restarts.
+"""
+
+import os
+import hashlib
+import threading
+import collections
+
+CACHE_DIR = "assistant/custom/cache/speech/"
+
+EXTENSIONS = {"mp3": "mp3", "ogg_vorbis": "ogg", "pcm": "pcm"}
+
+
+def speech_key(voice, format, text):
+    """Content address of a clip."""
+    data = "\0".join((voice, format, text)).encode()
+    extension = EXTENSIONS.get(format, format)
+    return f"{hashlib.sha1(data).hexdigest()}.{extension}"
+
+
+class SpeechCache(object):
+    """Two-tier LRU cache of audio bytes, see module docstring."""
+
+    def __init__(
+        self,
+        path=CACHE_DIR,
+        memory_bytes=8 * 1024 * 1024,
+        disk_bytes=256 * 1024 * 1024,
+    ):
+        self.path = path
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = collections.OrderedDict()
+        self._memory_size = 0
+        self._lock = threading.Lock()
+        self._disk = self._scan()
+        self._disk_size = sum(self._disk.values())
+
+    def _scan(self):
+        """Files on disk by name with their size, oldest first."""
+        try:
+            names = os.listdir(self.path)
+        except OSError:
+            return collections.OrderedDict()
+        files = []
+        for name in names:
+            if name.endswith(".tmp"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.path, name))
+            except OSError:
+                continue
+            files.append((stat.st_mtime, name, stat.st_size))
+        return collections.OrderedDict(
+            (name, size) for _, name, size in sorted(files)
+        )
+
+    def get(self, voice, format, text):
+        """Return cached audio bytes or None."""
+        key = speech_key(voice, format, text)
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return audio
+            on_disk = key in self._disk
+
+        if on_disk:
+            filename = os.path.join(self.path, key)
+            try:
+                with open(filename, "rb") as file:
+                    audio = file.read()
+                os.utime(filename)
+            except OSError:
+                audio = None
+            with self._lock:
+                if audio is None:
+                    self._disk_size -= self._disk.pop(key, 0)
+                else:
+                    if key in self._disk:
+                        self._disk.move_to_end(key)
+                    self.disk_hits += 1
+                    self._remember(key, audio)
+                    return audio
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, voice, format, text, audio):
+        """Store audio bytes in both tiers."""
+        key = speech_key(voice, format, text)
+        with self._lock:
+            self._remember(key, audio)
+        if len(audio) > self.disk_bytes:
+            return
+
+        filename = os.path.join(self.path, key)
+        temporary = f"{filename}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            with open(temporary, "wb") as file:
+                file.write(audio)
+            os.replace(temporary, filename)
+        except OSError:
+            return
+
+        with self._lock:
+            self._disk_size += len(audio) - self._disk.pop(key, 0)
+            self._disk[key] = len(audio)
+            stale = []
+            while self._disk_size > self.disk_bytes:
+                name, size = self._disk.popitem(last=False)
+                self._disk_size -= size
+                stale.append(name)
+        for name in stale:
+            try:
+                os.remove(os.path.join(self.path, name))
+            except OSError:
+                pass
+
+    def _remember(self, key, audio):
+        """Keep audio in memory, the lock must be held."""
+        if len(audio) > self.memory_bytes:
+            return
+        self._memory_size += len(audio) - len(self._memory.pop(key, b""))
+        self._memory[key] = audio
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def info(self):
+        """Return cache statistics."""
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_clips": len(self._memory),
+            "memory_bytes": self._memory_size,
+            "disk_clips": len(self._disk),
+            "disk_bytes": self._disk_size,
+        }
@@ -1,5 +1,40 @@
 import os
+import re
+import queue
 import boto3
+import threading
+
+from .speech_cache import SpeechCache
+from ...modules.audio import engine, RATE, SPEECH
+from ...utils import metrics
+
+# raw speech is 16 bit mono as played by the audio engine, in 100ms chunks
+SAMPLE_RATE = RATE
+CHUNK_BYTES = SAMPLE_RATE // 10 * 2
+
+sentence_end = re.compile(r"(?<=[.!?])\s+")
+clause_end = re.compile(r"(?<=[,;:])\s+")
+
+
+def split_speech(text, limit=150):
+    """Split text into segments of at most about limit characters at
+    sentence, or if a sentence is too long, clause boundaries.
+    """
+    text = " ".join(text.split())
+    pieces = []
+    for sentence in sentence_end.split(text):
+        if len(sentence) > limit:
+            pieces += clause_end.split(sentence)
+        else:
+            pieces.append(sentence)
+
+    segments = []
+    for piece in pieces:
+        if segments and len(segments[-1]) + len(piece) < limit:
+            segments[-1] += " " + piece
+        elif piece:
+            segments.append(piece)
+    return segments
 
 
 class TTS:
@@ -18,27 +53,105 @@ class TTS:
             region_name=region_name,
         ).client("polly")
 
-    def say(self, text, voiceID="Brian"):
+        # synthesized speech by (voice, format, text)
+        self.cache = SpeechCache()
+        metrics.register("tts_cache", self.cache.info)
+
+    def audio(self, text, voiceID="Brian", format="mp3"):
+        """Return speech audio bytes, from the cache if said before."""
+        audio = self.cache.get(voiceID, format, text)
+        if audio is None:
+            response = self.client.synthesize_speech(
+                VoiceId=voiceID, OutputFormat=format, Text=text
+            )
+            audio = response["AudioStream"].read()
+            self.cache.put(voiceID, format, text, audio)
+        return audio
+
+    def stream(self, text, voiceID="Brian"):
+        """Yield raw speech chunks as they arrive from Polly, so that
+        playback can start before the whole clip is synthesized.
+        """
+        audio = self.cache.get(voiceID, "pcm", text)
+        if audio is not None:
+            for start in range(0, len(audio), CHUNK_BYTES):
+                yield audio[start:start + CHUNK_BYTES]
+            return
+
         response = self.client.synthesize_speech(
-            VoiceId=voiceID, OutputFormat="mp3", Text=text
+            VoiceId=voiceID,
+            OutputFormat="pcm",
+            SampleRate=str(SAMPLE_RATE),
+            Text=text,
         )
+        body = response["AudioStream"]
+        chunks, rest = [], b""
+        while True:
+            chunk = body.read(CHUNK_BYTES)
+            if not chunk:
+                break
+            # keep whole samples only, the odd byte goes with the next
+            chunk = rest + chunk
+            whole = len(chunk) - len(chunk) % 2
+            chunk, rest = chunk[:whole], chunk[whole:]
+            chunks.append(chunk)
+            yield chunk
+        self.cache.put(voiceID, "pcm", text, b"".join(chunks))
 
-        with open(self.audio_folder + "speech.mp3", "wb") as file:
-            file.write(response["AudioStream"].read())
+    def say(self, text, voiceID="Brian"):
+        engine.play(self.stream(text, voiceID), SPEECH, wait=True)
+
+    def say_segments(self, segments, voiceID="Brian", lookahead=2):
+        """Say segments one after another. The first one is streamed,
+        while it plays up to lookahead next ones are synthesized ahead.
+        """
+        if len(segments) < 2:
+            for segment in segments:
+                self.say(segment, voiceID)
+            return
+
+        ready = queue.Queue(maxsize=lookahead)
+        stopped = threading.Event()
+
+        def put(item):
+            while not stopped.is_set():
+                try:
+                    ready.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def synthesize():
+            for segment in segments[1:]:
+                try:
+                    audio = b"".join(self.stream(segment, voiceID))
+                except Exception as error:
+                    put(error)
+                    return
+                if not put(audio):
+                    return
 
-        os.system(f"mpg123 {self.audio_folder}speech.mp3 >/dev/null 2>&1")
-        os.system(f"rm {self.audio_folder}speech.mp3")
+        def chunks():
+            try:
+                yield from self.stream(segments[0], voiceID)
+                for _ in segments[1:]:
+                    item = ready.get()
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+            finally:
+                # also when the engine was interrupted
+                stopped.set()
+
+        threading.Thread(target=synthesize, daemon=True).start()
+        engine.play(chunks(), SPEECH, wait=True)
 
     def save_to_file(self, text, voiceID="Brian", name=""):
-        response = self.client.synthesize_speech(
-            VoiceId=voiceID, OutputFormat="mp3", Text=text
-        )
+        audio = self.audio(text, voiceID)
         name = name + "_" + "_".join(text.split(" ")[0:4])
         with open(self.audio_folder + f"{name}.mp3", "wb") as file:
-            file.write(response["AudioStream"].read())
+            file.write(audio)
 
     def synthesize_speech(self, text):
-        response = self.client.synthesize_speech(
-            VoiceId="Brian", OutputFormat="ogg_vorbis", Text=text  # 'Matthew'
-        )
-        return response["AudioStream"].read()
+        return self.audio(text, "Brian", "ogg_vorbis")  # 'Matthew'
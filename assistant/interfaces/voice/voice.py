@@ -10,7 +10,7 @@ from google.cloud.speech import enums
 from google.cloud.speech import types
 
 from .microphone_stream import MicrophoneStream, RATE
-from .text_to_speech import TTS
+from .text_to_speech import TTS, split_speech
 from ...utils import colored
 from assistant.custom import wrappers
 
@@ -29,6 +29,9 @@ streaming_config = types.StreamingRecognitionConfig(
 class VoiceInterface:
     """Voice interface."""
 
+    # see utils.CAPABILITIES
+    kind = "voice"
+
     def __init__(self, notifier, voice="Brian"):
         self.voice = voice
         self.notifier = notifier
@@ -154,7 +157,9 @@ class VoiceInterface:
     def output(self, text, prob=1):
         if prob == 1 or random.random() < prob:
             self.prev_answer = text
-            self.tts.say(text, voiceID=self.voice)
+            # long replies are synthesized sentence by sentence, so the
+            # first one plays while the rest are synthesized
+            self.tts.say_segments(split_speech(text), voiceID=self.voice)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,366 @@
+"""In-process audio output.
+
+A single engine thread keeps one output stream open and plays queued
+clips of 16 bit mono PCM one after another, acknowledgements before
+speech before dings. Clips are raw bytes or an iterable of chunks, e.g.
+speech still arriving from Polly. Playing a sound is a queue push rather
+than a process spawn and an output device open.
+
+Chunks of a clip are produced by a thread of its own into a small
+buffer, the engine thread only writes PCM already in memory and so
+notices an interrupt within one write, even while the producer still
+waits for the network. A clip that fails to produce or play keeps its
+error, which `play(..., wait=True)` raises to the caller.
+"""
+
+import os
+import time
+import wave
+import queue
+import random
+import functools
+import itertools
+import threading
+import subprocess
+
+try:
+    import miniaudio
+except ImportError:
+    miniaudio = None
+
+from assistant.utils import metrics
+
+RATE = 16000
+SAMPLE_WIDTH = 2
+
+# clip priorities, lower plays first
+ACKNOWLEDGEMENT = 0
+SPEECH = 1
+DING = 2
+
+# 20ms, how often a playing clip checks whether it was stopped
+WRITE_BYTES = RATE // 50 * SAMPLE_WIDTH
+
+# chunks of a clip produced ahead of the one playing
+BUFFER_CHUNKS = 32
+
+
+def convert(data, width, channels, rate):
+    """Convert raw audio to the engine's format."""
+    if (width, channels, rate) == (SAMPLE_WIDTH, 1, RATE):
+        return data
+    if miniaudio is None:
+        raise RuntimeError("miniaudio is needed to convert audio")
+    formats = {
+        1: miniaudio.SampleFormat.UNSIGNED8,
+        2: miniaudio.SampleFormat.SIGNED16,
+        3: miniaudio.SampleFormat.SIGNED24,
+        4: miniaudio.SampleFormat.SIGNED32,
+    }
+    return bytes(
+        miniaudio.convert_frames(
+            formats[width],
+            channels,
+            rate,
+            data,
+            miniaudio.SampleFormat.SIGNED16,
+            1,
+            RATE,
+        )
+    )
+
+
+def decode(path):
+    """Decode a wav or an mp3 file to PCM in the engine's format."""
+    if miniaudio is not None:
+        decoded = miniaudio.decode_file(
+            path,
+            output_format=miniaudio.SampleFormat.SIGNED16,
+            nchannels=1,
+            sample_rate=RATE,
+        )
+        return decoded.samples.tobytes()
+    if path.endswith(".wav"):
+        with wave.open(path, "rb") as file:
+            return convert(
+                file.readframes(file.getnframes()),
+                file.getsampwidth(),
+                file.getnchannels(),
+                file.getframerate(),
+            )
+    # without miniaudio mpg123 decodes to a pipe, no shell or temp file
+    return subprocess.run(
+        ["mpg123", "-q", "-s", "-m", "-e", "s16", "-r", str(RATE), path],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        check=True,
+    ).stdout
+
+
+@functools.lru_cache(maxsize=32)
+def sound(path):
+    """PCM of a sound file, decoded on first use only."""
+    return decode(path)
+
+
+class ClipBank(object):
+    """Sound files of a folder decoded once into memory, at most
+    max_bytes of them, and decoded again when the folder changes.
+    """
+
+    def __init__(self, path, max_bytes=16 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.clips = {}
+        self.size = 0
+        self.skipped = 0
+        self.loads = 0
+        self._stamps = None
+        self.load()
+
+    def stamps(self):
+        """Names, modification times and sizes of the folder's files."""
+        result = []
+        for name in sorted(os.listdir(self.path)):
+            try:
+                stat = os.stat(os.path.join(self.path, name))
+            except OSError:
+                continue
+            result.append((name, stat.st_mtime_ns, stat.st_size))
+        return tuple(result)
+
+    def load(self):
+        """Decode every file of the folder that fits in max_bytes."""
+        stamps = self.stamps()
+        clips, size, skipped = {}, 0, 0
+        for name, _, _ in stamps:
+            try:
+                pcm = decode(os.path.join(self.path, name))
+            except Exception as error:
+                print(f"Can not decode {name}: {error!r}")
+                continue
+            if size + len(pcm) > self.max_bytes:
+                skipped += 1
+                continue
+            clips[name] = pcm
+            size += len(pcm)
+        if skipped:
+            print(f"{skipped} clips of {self.path} exceed the memory cap")
+        self.clips, self.size, self.skipped = clips, size, skipped
+        self._stamps = stamps
+        self.loads += 1
+
+    def choice(self):
+        """PCM of a random clip or None if there are none."""
+        clips = list(self.clips.values())
+        return random.choice(clips) if clips else None
+
+    def watch(self, interval=2):
+        """Load the clips again whenever the folder changes, never
+        returns.
+        """
+        while True:
+            time.sleep(interval)
+            try:
+                if self.stamps() != self._stamps:
+                    self.load()
+            except OSError:
+                pass
+
+    def info(self):
+        """Return bank statistics."""
+        return {
+            "clips": len(self.clips),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "skipped": self.skipped,
+            "loads": self.loads,
+        }
+
+
+class Clip(object):
+    """A queued sound, can be waited for and stopped.
+
+    Chunks of audio other than bytes are produced into `buffer` by a
+    thread started with the clip, None marks the end and an exception
+    a failure. The exception the clip failed with, if any, is kept in
+    `error` once it is done.
+    """
+
+    def __init__(self, audio, priority, epoch=0):
+        self.audio = audio
+        self.priority = priority
+        self.epoch = epoch
+        self.stopped = False
+        self.error = None
+        self.done = threading.Event()
+        self.buffer = queue.Queue(maxsize=BUFFER_CHUNKS)
+        if isinstance(audio, (bytes, bytearray, memoryview)):
+            self.buffer.put(audio)
+            self.buffer.put(None)
+        else:
+            threading.Thread(target=self._produce, daemon=True).start()
+
+    def stop(self):
+        self.stopped = True
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+    def _put(self, item):
+        while not self.stopped:
+            try:
+                self.buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _produce(self):
+        try:
+            for chunk in self.audio:
+                if not self._put(chunk):
+                    break
+            else:
+                self._put(None)
+        except Exception as error:
+            self._put(error)
+        finally:
+            close = getattr(self.audio, "close", None)
+            if close is not None:
+                # lets a generator still producing the clip clean up
+                close()
+
+    def chunks(self):
+        """Yield buffered chunks until the end or until stopped, None
+        while the producer is behind so the caller can check for stop.
+        """
+        while not self.stopped:
+            try:
+                # as long as one write takes
+                chunk = self.buffer.get(timeout=0.02)
+            except queue.Empty:
+                yield None
+                continue
+            if chunk is None:
+                return
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+
+
+class AudioEngine(object):
+    """Plays clips on a persistent output stream, see module docstring."""
+
+    def __init__(self):
+        self.played = 0
+        self.interrupted = 0
+        # clips queued before the last interrupt are not played
+        self._epoch = 0
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._current = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._audio = None
+        self._stream = None
+
+    def play(self, audio, priority=SPEECH, wait=False):
+        """Queue PCM bytes or chunks and return the Clip. If wait is
+        True, wait for it to finish playing and raise the error it
+        failed with.
+        """
+        with self._lock:
+            clip = Clip(audio, priority, self._epoch)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._queue.put((priority, next(self._order), clip))
+        if wait:
+            clip.wait()
+            if clip.error is not None:
+                raise clip.error
+        return clip
+
+    def interrupt(self):
+        """Stop the playing clip and drop queued ones."""
+        with self._lock:
+            self._epoch += 1
+            while True:
+                try:
+                    _, _, clip = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                self._finish(clip)
+            if self._current is not None:
+                self._current.stop()
+                self.interrupted += 1
+
+    def _open(self):
+        if self._stream is None:
+            # imported once something plays, not by importing the module
+            import pyaudio
+
+            self._audio = pyaudio.PyAudio()
+            self._stream = self._audio.open(
+                format=self._audio.get_format_from_width(SAMPLE_WIDTH),
+                channels=1,
+                rate=RATE,
+                output=True,
+            )
+        elif self._stream.is_stopped():
+            self._stream.start_stream()
+        return self._stream
+
+    def _run(self):
+        while True:
+            _, _, clip = self._queue.get()
+            with self._lock:
+                if clip.epoch != self._epoch:
+                    self._finish(clip)
+                    continue
+                self._current = clip
+            try:
+                self._play(clip)
+            except Exception as error:
+                clip.error = error
+                print("Audio output failed:", error)
+            finally:
+                with self._lock:
+                    self._current = None
+                self._finish(clip)
+                self.played += 1
+            if self._queue.empty() and self._stream is not None:
+                # nothing to play, do not let the device underrun
+                self._stream.stop_stream()
+
+    def _play(self, clip):
+        stream = self._open()
+        rest = b""
+        for chunk in clip.chunks():
+            if chunk is None:
+                continue
+            chunk = rest + bytes(chunk)
+            whole = len(chunk) - len(chunk) % SAMPLE_WIDTH
+            chunk, rest = chunk[:whole], chunk[whole:]
+            for start in range(0, len(chunk), WRITE_BYTES):
+                if clip.stopped:
+                    return
+                stream.write(chunk[start:start + WRITE_BYTES])
+
+    def _finish(self, clip):
+        # ends the producer, which closes the clip's audio
+        clip.stop()
+        clip.done.set()
+
+    def info(self):
+        """Return engine statistics."""
+        return {
+            "played": self.played,
+            "interrupted": self.interrupted,
+            "queued": self._queue.qsize(),
+        }
+
+
+engine = AudioEngine()
+metrics.register("audio", engine.info)
@@ -3,6 +3,7 @@
 import collections
 import pyaudio
 from . import snowboydetect
+from .. import audio
 import time
 import wave
 import os
@@ -19,6 +20,9 @@ RESOURCE_FILE = os.path.join(TOP_DIR, "resources/common.res")
 DETECT_DING = os.path.join(TOP_DIR, "resources/ding.wav")
 DETECT_DONG = os.path.join(TOP_DIR, "resources/dong.wav")
 
+# decoded once, so the ding plays without reading the file
+audio.sound(DETECT_DING)
+
 
 def py_error_handler(filename, line, function, err, fmt):
     pass
@@ -67,23 +71,7 @@ def play_audio_file(fname=DETECT_DING):
     :param str fname: wave file name
     :return: None
     """
-    ding_wav = wave.open(fname, "rb")
-    ding_data = ding_wav.readframes(ding_wav.getnframes())
-    with no_alsa_error():
-        audio = pyaudio.PyAudio()
-    stream_out = audio.open(
-        format=audio.get_format_from_width(ding_wav.getsampwidth()),
-        channels=ding_wav.getnchannels(),
-        rate=ding_wav.getframerate(),
-        input=False,
-        output=True,
-    )
-    stream_out.start_stream()
-    stream_out.write(ding_data)
-    time.sleep(0.2)
-    stream_out.stop_stream()
-    stream_out.close()
-    audio.terminate()
+    audio.engine.play(audio.sound(fname), audio.DING)
 
 
 class HotwordDetector(object):
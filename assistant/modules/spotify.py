@@ -8,6 +8,8 @@ import threading
 import spotipy.util as util
 import tekore as tk
 
+from assistant.utils import memoize
+
 scope = (
     "ugc-image-upload "
     "user-read-playback-state "
@@ -214,10 +216,16 @@ class _Spotify(tk.Spotify):
             track_ids=genre_tracks_ids, device_id=device_id
         )
 
+    @memoize(ttl=86400)
     def get_genres(self):
         """"""
         return self.recommendation_genre_seeds()
 
+    @memoize(ttl=3600, maxsize=256)
+    def search_items(self, query, type, limit=1):
+        """Search items of a type, results are cached for an hour."""
+        return self.search(query=query, types=(type,), limit=limit)[0].items
+
     @pick_device
     def set_volume(self, volume_percent, device_id=None):
         """"""
@@ -228,32 +236,26 @@ class _Spotify(tk.Spotify):
     @pick_device
     def search_and_play_track(self, query, device_id=None):
         """"""
-        track_id = (
-            self.search(query=query, types=("track",), limit=1)[0].items[0].id
-        )
+        track_id = self.search_items(query, "track")[0].id
         self.playback_start_tracks(track_ids=[track_id], device_id=device_id)
         # TODO: add similar tracks to the queue
 
     @pick_device
     def search_and_play_album(self, query, device_id=None):
         """"""
-        uri = (
-            self.search(query=query, types=("album",), limit=1)[0].items[0].uri
-        )
+        uri = self.search_items(query, "album")[0].uri
         self.playback_start_context(context_uri=uri, device_id=device_id)
 
     @pick_device
     def search_and_play_playlist(self, query, device_id=None):
         """"""
-        playlists = self.search(
-            query=query, types=("playlist",), limit=5)[0].items
+        playlists = self.search_items(query, "playlist", limit=5)
         uri = random.choice(playlists).uri
         self.playback_start_context(context_uri=uri, device_id=device_id)
 
     @pick_device
     def search_and_play_artist(self, query, device_id=None):
-        uri = self.search(
-            query=query, types=("artist",), limit=1)[0].items[0].uri
+        uri = self.search_items(query, "artist")[0].uri
         self.playback_start_context(context_uri=uri, device_id=device_id)
 
     def get_current_track_description(self):
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""NLU benchmark suite.
+
+Runs the utterances of a corpus, and interim transcripts derived from
+them, through every NLU stage against the installed skills extended
+with a synthetic skill catalogue. Reports throughput and p50/p99 latency
+per stage and saves JSON results to compare between versions.
+
+Usage:
+    python -m assistant.nlp.bench [--skills N] [--output FILE]
+                                  [--compare FILE]
+    python -m assistant.nlp.bench --matcher [N ...]
+
+With --matcher the compiled IntentMatcher is compared with the former
+approach of compiling and scanning every expression on each call.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+import collections
+
+from tabulate import tabulate
+
+from .nlu import prepare_regex_expressions, NaturalLanguageUnderstander
+from .nlp import NaturalLanguageProcessor, separators_regex
+from .matcher import IntentMatcher
+from ..skills import expressions
+
+CORPUS = os.path.join(os.path.dirname(__file__), "bench_corpus.txt")
+
+
+def synthetic_expressions(n_skills):
+    """Generate skill expressions shaped like the real ones."""
+    expressions = collections.OrderedDict()
+    for n in range(n_skills):
+        expressions[f"skill{n}"] = [
+            f"(?:turn|switch) on device{n} in(?: the)? <room>",
+            f"(?:play|put on) genre{n} by <<artist>>",
+            f"(?:set|change) thing{n} to <level>",
+            f"(?:new|add) thing{n}",
+        ]
+    return expressions
+
+
+def synthetic_texts(n_skills):
+    """Texts hitting the first, middle and last skills and no skill."""
+    texts = []
+    for n in (0, n_skills // 2, n_skills - 1):
+        texts += [
+            f"turn on device{n} in the kitchen",
+            f"put on genre{n} by the rolling stones",
+            f"add thing{n}",
+        ]
+    texts.append("what is the meaning of life")
+    return texts
+
+
+def legacy_match(processed, text):
+    """Per-call compile and scan, as regex_undestand used to do."""
+    for intent in processed:
+        for expr in processed[intent]:
+            found = re.compile(expr["regex"]).findall(text)
+            if found:
+                return intent, expr["value"]
+    return None
+
+
+def compiled_match(matcher, text):
+    match = matcher.match(text)
+    if match:
+        return match.intent, match.expression["value"]
+    return None
+
+
+def timeit(func, texts, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            func(text)
+    return (time.perf_counter() - start) / (repeat * len(texts))
+
+
+def run_matcher(sizes=(10, 100, 300, 600), repeat=20):
+    rows = []
+    for size in sizes:
+        processed = prepare_regex_expressions(synthetic_expressions(size))
+        start = time.perf_counter()
+        matcher = IntentMatcher(processed)
+        build = time.perf_counter() - start
+        texts = synthetic_texts(size)
+
+        for text in texts:
+            assert legacy_match(processed, text) == compiled_match(
+                matcher, text
+            ), text
+
+        legacy = timeit(lambda t: legacy_match(processed, t), texts, repeat)
+        compiled = timeit(lambda t: compiled_match(matcher, t), texts, repeat)
+        rows.append(
+            [
+                size,
+                len(matcher),
+                f"{build * 1e3:.1f}",
+                f"{legacy * 1e6:.0f}",
+                f"{compiled * 1e6:.0f}",
+                f"{legacy / compiled:.1f}x",
+            ]
+        )
+
+    print(
+        tabulate(
+            rows,
+            headers=[
+                "skills",
+                "expressions",
+                "build ms",
+                "legacy us/text",
+                "compiled us/text",
+                "speedup",
+            ],
+        )
+    )
+
+
+def load_corpus(path=CORPUS, n_skills=100, seed=0):
+    """Read utterances filling {n} with random synthetic skill numbers."""
+    generator = random.Random(seed)
+    utterances = []
+    with open(path) as file:
+        for line in file:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            while "{n}" in line:
+                number = generator.randrange(max(n_skills, 1))
+                line = line.replace("{n}", str(number), 1)
+            utterances.append(line)
+    return utterances
+
+
+def interim_sequence(utterance):
+    """Interim transcripts of an utterance as a streaming recognizer
+    would send them: a partial and then a complete word at a time.
+    """
+    words = utterance.split(" ")
+    sequence = []
+    for i, word in enumerate(words):
+        prefix = " ".join(words[:i] + [word[:len(word) // 2]])
+        if len(word) > 3:
+            sequence.append(prefix)
+        sequence.append(" ".join(words[:i + 1]))
+    return sequence
+
+
+def measure(func, inputs, repeat):
+    """Call func on every input and return latencies in seconds."""
+    latencies = []
+    clock = time.perf_counter
+    for _ in range(repeat):
+        for item in inputs:
+            start = clock()
+            func(item)
+            latencies.append(clock() - start)
+    return latencies
+
+
+def summary(latencies):
+    ordered = sorted(latencies)
+    total = sum(ordered)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+    return {
+        "calls": len(ordered),
+        "throughput": len(ordered) / total if total else None,
+        "mean_us": total / len(ordered) * 1e6,
+        "p50_us": percentile(0.5) * 1e6,
+        "p99_us": percentile(0.99) * 1e6,
+    }
+
+
+def git_version():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=os.path.dirname(__file__),
+        ).stdout.decode().strip() or None
+    except OSError:
+        return None
+
+
+def run_suite(n_skills=100, repeat=5, corpus=CORPUS):
+    """Run every stage and return results as a JSON-serializable dict."""
+    catalogue = collections.OrderedDict(expressions)
+    catalogue.update(synthetic_expressions(n_skills))
+    processed = prepare_regex_expressions(catalogue)
+
+    def processor(cache_size):
+        nlp = NaturalLanguageProcessor(cache_size=cache_size)
+        nlp.nlu = NaturalLanguageUnderstander(
+            expressions=processed, cache_size=cache_size
+        )
+        return nlp
+
+    utterances = load_corpus(corpus, n_skills)
+    sequences = [interim_sequence(u) for u in utterances]
+    interims = [text for sequence in sequences for text in sequence]
+    # utterances of several parts repeat the most earlier segments
+    several = [
+        sequence
+        for utterance, sequence in zip(utterances, sequences)
+        if separators_regex.search(utterance)
+    ]
+
+    uncached = NaturalLanguageUnderstander(expressions=processed, cache_size=0)
+    cached = NaturalLanguageUnderstander(expressions=processed)
+    full = processor(cache_size=0)
+    reusing = processor(cache_size=256)
+
+    def interim_full(sequence):
+        for text in sequence:
+            list(full.structs(text))
+
+    def interim_cached(sequence):
+        for text in sequence:
+            list(reusing.structs(text))
+
+    structs = [struct for text in interims for struct in full.structs(text)]
+    pairs = list(zip(structs, structs[1:] + structs[:1]))
+
+    stages = collections.OrderedDict(
+        [
+            ("understand", (uncached.understand, utterances)),
+            ("understand_cached", (cached.understand, utterances)),
+            ("structs", (lambda t: list(full.structs(t)), utterances)),
+            ("interim_full", (interim_full, sequences)),
+            ("interim_cached", (interim_cached, sequences)),
+            ("interim_full_several", (interim_full, several)),
+            ("interim_cached_several", (interim_cached, several)),
+            ("is_complete", (lambda s: s.is_complete(), structs)),
+            ("eq", (lambda pair: pair[0] == pair[1], pairs)),
+        ]
+    )
+
+    results = {
+        "version": git_version(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "intents": len(processed),
+        "expressions": sum(len(e) for e in processed.values()),
+        "utterances": len(utterances),
+        "interim_transcripts": len(interims),
+        "stages": collections.OrderedDict(),
+    }
+    for name, (func, inputs) in stages.items():
+        results["stages"][name] = summary(measure(func, inputs, repeat))
+    return results
+
+
+def report(results, baseline=None):
+    rows = []
+    for name, stage in results["stages"].items():
+        row = [
+            name,
+            stage["calls"],
+            f"{stage['throughput']:.0f}",
+            f"{stage['p50_us']:.1f}",
+            f"{stage['p99_us']:.1f}",
+        ]
+        if baseline and name in baseline["stages"]:
+            old = baseline["stages"][name]
+            row += [
+                f"{old['p50_us']:.1f}",
+                f"{old['p50_us'] / stage['p50_us']:.2f}x",
+            ]
+        rows.append(row)
+
+    headers = ["stage", "calls", "calls/s", "p50 us", "p99 us"]
+    if baseline:
+        headers += [f"p50 us ({baseline['version']})", "speedup"]
+    print(
+        f"{results['intents']} intents, "
+        f"{results['expressions']} expressions, "
+        f"version {results['version']}"
+    )
+    print(tabulate(rows, headers=headers))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m assistant.nlp.bench", description="NLU benchmarks."
+    )
+    parser.add_argument("--skills", type=int, default=100,
+                        help="number of synthetic skills")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--corpus", default=CORPUS)
+    parser.add_argument("--output", help="save results to a JSON file")
+    parser.add_argument("--compare", help="JSON results to compare with")
+    parser.add_argument("--matcher", type=int, nargs="*",
+                        help="compare intent matchers for these sizes")
+    args = parser.parse_args(argv)
+
+    if args.matcher is not None:
+        run_matcher(sizes=args.matcher or (10, 100, 300, 600))
+        return
+
+    results = run_suite(args.skills, args.repeat, args.corpus)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+    report(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,76 @@
+"""Aho-Corasick index of custom entity values."""
+
+import collections
+
+
+class Gazetteer(object):
+    """Find custom entities defined in skills in one scan over a text.
+
+    All values of all entity keys are compiled into a single Aho-Corasick
+    automaton. For every key the leftmost occurrence wins, and values
+    found at the same position are ranked in the order they are listed,
+    as with a regex alternation of the values.
+    """
+
+    def __init__(self, entities):
+        self.keys = list(entities)
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        for key_index, key in enumerate(self.keys):
+            for order, value in enumerate(entities[key]):
+                if value:
+                    self._add(value, key_index, order)
+        self._link()
+
+    def _add(self, value, key_index, order):
+        node = 0
+        for char in value:
+            child = self._goto[node].get(char)
+            if child is None:
+                child = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[node][char] = child
+            node = child
+        self._output[node].append((key_index, order, len(value)))
+
+    def _link(self):
+        """Set failure links breadth-first and merge outputs."""
+        queue = collections.deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._output[child] = (
+                    self._output[child] + self._output[self._fail[child]]
+                )
+
+    def find(self, text):
+        """Return a dict of entity key to the first value found in text."""
+        goto, fail, output = self._goto, self._fail, self._output
+        best = {}
+        node = 0
+        if len(goto) == 1:
+            return best
+
+        for position, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+
+            for key_index, order, length in output[node]:
+                rank = (position + 1 - length, order)
+                if key_index not in best or rank < best[key_index][0]:
+                    best[key_index] = (rank, length)
+
+        return {
+            self.keys[key_index]: text[start:start + length]
+            for key_index, ((start, _), length) in sorted(best.items())
+        }
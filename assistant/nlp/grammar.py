@@ -0,0 +1,303 @@
+"""Grammar compiled from skills' expressions and entities."""
+
+import os
+import re
+import json
+import pickle
+import hashlib
+import collections
+
+from .matcher import IntentMatcher
+from .gazetteer import Gazetteer
+from .literals import literal_tokens
+from .. import skills
+from ..skills import expressions
+from ..utils import CAPABILITIES, scope_allows
+
+CACHE_PATH = "assistant/custom/cache/grammar.pickle"
+USAGE_PATH = "assistant/custom/cache/expression_usage.json"
+
+# the cache pickles objects of these modules, it is rebuilt whenever
+# the source of one of them changes
+MODULES = ("grammar", "matcher", "literals", "gazetteer", "nlu")
+
+
+def source_hash(modules=MODULES):
+    digest = hashlib.sha1()
+    for module in modules:
+        path = os.path.join(os.path.dirname(__file__), module + ".py")
+        with open(path, "rb") as source:
+            digest.update(source.read())
+    return digest.hexdigest()
+
+
+VERSION = source_hash()
+
+# every (interface kind, device role) a capability can refer to, their
+# grammars are built ahead and cached along with the full one
+SCOPES = [
+    (kind, role)
+    for kind in sorted({kind for kind, _ in CAPABILITIES.values() if kind})
+    for role in sorted({role for _, role in CAPABILITIES.values() if role})
+]
+
+
+def prepare_regex_expressions(expressions=expressions):
+    """Convert expressions defined in skills
+    into a proper regex format.
+    """
+    processed_exprs = {}
+    entities_regex = re.compile(r"<{1,2}(.*?)>{1,2}")
+
+    for intent, exprs in expressions.items():
+        for expr in exprs:
+            # extract entities
+            entity_names = re.findall(entities_regex, expr)
+
+            # create search regex
+            regex = re.sub(r"<<.*?>>", r"(.*)", expr)  # "(.*?)"
+            regex = re.sub(r"<.*?>", r"([a-zA-Z0-9_]*)", regex)
+
+            result = {
+                "value": expr,
+                "regex": regex,
+                "entity_names": entity_names,
+                "tokens": literal_tokens(expr),
+            }
+            try:
+                processed_exprs[intent].append(result)
+            except KeyError:
+                processed_exprs[intent] = [result]
+    return processed_exprs
+
+
+IntentInfo = collections.namedtuple(
+    "IntentInfo", ["required", "has_entities", "open_ended", "last_open"]
+)
+
+
+def intent_table(processed):
+    """Precompute what `TextStructure.is_complete` needs to know about
+    every intent: entities required by its first expression, whether
+    any expression has entities or open-ended <<entities>>, and whether
+    the last entity of each expression is open-ended.
+    """
+    slots_regex = re.compile(r"<{1,2}.*?>{1,2}")
+    table = {}
+    for intent, exprs in processed.items():
+        values = [expr["value"] for expr in exprs]
+        last_open = {}
+        for value in values:
+            slots = slots_regex.findall(value)
+            last_open[value] = bool(slots) and "<<" in slots[-1]
+        table[intent] = IntentInfo(
+            required=frozenset(exprs[0]["entity_names"]),
+            has_entities=any("<" in value for value in values),
+            open_ended=any("<<" in value for value in values),
+            last_open=last_open,
+        )
+    return table
+
+
+def read_usage(path=USAGE_PATH):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_usage(path=USAGE_PATH):
+    """Persist hits and costs of expressions learned by the matchers."""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "w") as file:
+            json.dump(
+                {value: row for value, row in usage.items() if row[0]}, file
+            )
+        os.replace(path + ".tmp", path)
+    except OSError:
+        pass
+
+
+# expression value -> [hits, cost in ns, cost samples], shared by the
+# matchers of every grammar so their learned order survives reloads
+usage = read_usage()
+
+
+class Grammar(object):
+    """Processed expressions, custom entities and every index
+    built from them.
+
+    A previous grammar lends its gazetteer if the entities are the same
+    and the compiled patterns of expressions it shares with this one.
+    """
+
+    def __init__(
+        self,
+        expressions,
+        entities,
+        key=None,
+        gazetteer=None,
+        capabilities=None,
+        previous=None,
+    ):
+        self.key = key
+        self.expressions = expressions
+        self.entities = entities
+        # capabilities of intents scoped grammars are built with
+        self.capabilities = capabilities
+        self.intents = intent_table(expressions)
+        self.matcher = IntentMatcher(
+            expressions, previous=previous and previous.matcher
+        )
+        self.matcher.attach(usage)
+        if gazetteer is None and previous is not None:
+            if previous.entities == entities:
+                gazetteer = previous.gazetteer
+        self.gazetteer = gazetteer or Gazetteer(entities)
+        # scope -> grammar of the scope, None if it is the same
+        self.scoped = {}
+        # skill name -> cache entry of its processed expressions
+        self.sources = {}
+
+    def attach(self, usage):
+        """Count usage of this and the scoped grammars' matchers."""
+        self.matcher.attach(usage)
+        for scoped in self.scoped.values():
+            if scoped is not None:
+                scoped.matcher.attach(usage)
+
+
+def scoped_grammar(grammar, scope, capabilities=None):
+    """Return grammar without intents whose skill functions can not run
+    in scope, a tuple of interface kind and device role (see
+    `utils.CAPABILITIES`). Built once per grammar and scope unless
+    capabilities other than the grammar's own are given.
+    """
+    if scope is None:
+        return grammar
+    if capabilities is None:
+        capabilities = grammar.capabilities
+        if capabilities is None:
+            capabilities = skills.capabilities
+        by_scope = grammar.scoped
+    else:
+        by_scope = {}
+
+    try:
+        return by_scope[scope] or grammar
+    except KeyError:
+        pass
+
+    allowed = collections.OrderedDict(
+        (intent, exprs) for intent, exprs in grammar.expressions.items()
+        if scope_allows(capabilities.get(intent, ()), scope)
+    )
+    if len(allowed) == len(grammar.expressions):
+        by_scope[scope] = None
+        return grammar
+    scoped = Grammar(
+        allowed,
+        grammar.entities,
+        key=grammar.key and f"{grammar.key}:{scope}",
+        gazetteer=grammar.gazetteer,
+        previous=grammar,
+    )
+    by_scope[scope] = scoped
+    return scoped
+
+
+def read_cache(path):
+    try:
+        with open(path, "rb") as file:
+            cache = pickle.load(file)
+        if cache["version"] == VERSION:
+            return cache
+    except Exception:
+        pass
+    return {"version": VERSION, "skills": {}, "grammar": None}
+
+
+def write_cache(cache, path):
+    """Write atomically, a failure only costs a rebuild next time."""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "wb") as file:
+            pickle.dump(cache, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+    except OSError:
+        pass
+
+
+def load_grammar(
+    path=CACHE_PATH,
+    manifest=None,
+    entities=None,
+    capabilities=None,
+    previous=None,
+):
+    """Return the grammar of skills in manifest, installed skills
+    by default.
+
+    Processed expressions of every skill are cached on disk along with
+    the hash of the skill's source from the skills manifest, and only
+    skills whose source changed are processed again, which also keeps
+    reloading a changed skill cheap. Indexes over all skills, and the
+    grammars of every scope in SCOPES, are reused as long as no skill
+    changed.
+
+    On a reload the previous grammar is given, its skills' entries are
+    used instead of reading the cache and it lends whatever did not
+    change to the new grammar.
+    """
+    if manifest is None:
+        manifest = skills.manifest
+        entities = skills.entities
+        capabilities = skills.capabilities
+    if previous is not None:
+        cache = {"version": VERSION, "skills": previous.sources}
+        cache["grammar"] = None
+    else:
+        cache = read_cache(path)
+    changed = False
+    processed = {}
+    entries = {}
+
+    for name, skill in manifest.items():
+        entry = cache["skills"].get(name)
+        if entry is None or entry["hash"] != skill["hash"]:
+            entry = {
+                "hash": skill["hash"],
+                "expressions": prepare_regex_expressions(skill["regex"]),
+            }
+            changed = True
+        entries[name] = entry
+        processed.update(entry["expressions"])
+
+    key = hashlib.sha1(
+        "".join(f"{name}:{entry['hash']};" for name, entry in entries.items())
+        .encode()
+    ).hexdigest()
+
+    grammar = cache["grammar"]
+    if grammar is None or grammar.key != key:
+        grammar = Grammar(
+            processed,
+            entities,
+            key=key,
+            capabilities=capabilities,
+            previous=previous,
+        )
+        for scope in SCOPES:
+            scoped_grammar(grammar, scope)
+        changed = True
+    else:
+        grammar.attach(usage)
+    grammar.sources = entries
+
+    if changed or set(entries) != set(cache["skills"]):
+        write_cache(
+            {"version": VERSION, "skills": entries, "grammar": grammar}, path
+        )
+    return grammar
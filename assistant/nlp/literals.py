@@ -0,0 +1,216 @@
+"""Required literal tokens of skill expressions."""
+
+import re
+import collections
+
+SPECIAL = set("\\()[]{}<>.^$|?*+")
+QUANTIFIERS = set("?*+{")
+
+# flags that change how literals match, e.g. (?i) or (?x)
+flags_regex = re.compile(r"\(\?[aiLmsux-]+[:)]")
+
+
+def skip_class(value, position):
+    """Return the position of "]" closing a class opened at position."""
+    position += 1
+    if value[position:position + 1] == "^":
+        position += 1
+    if value[position:position + 1] == "]":
+        position += 1
+    while position < len(value) and value[position] != "]":
+        position += 2 if value[position] == "\\" else 1
+    return position
+
+
+def literal_runs(value):
+    """Split an expression into runs of literal characters that every
+    match contains, skipping groups, classes, slots and optional chars.
+    Returns None if the expression is an alternation at the top level.
+    """
+    runs, run = [], []
+    depth, position = 0, 0
+
+    def cut(keep=None):
+        runs.append("".join(run[:keep]))
+        run.clear()
+
+    while position < len(value):
+        char = value[position]
+        if char == "\\":
+            position += 1
+            if not depth:
+                cut()
+        elif char == "[":
+            position = skip_class(value, position)
+            if not depth:
+                cut()
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if not depth:
+                cut()
+        elif depth:
+            pass
+        elif char == "|":
+            return None
+        elif char == "<":
+            # entity slot
+            position = value.find(">", position)
+            while value[position + 1:position + 2] == ">":
+                position += 1
+            cut()
+        elif char in QUANTIFIERS:
+            # the previous character is optional or repeated
+            if char == "{":
+                position = value.find("}", position)
+            cut(keep=-1)
+        elif char in SPECIAL:
+            cut()
+        else:
+            run.append(char)
+        if position < 0:
+            break
+        position += 1
+
+    cut()
+    return runs
+
+
+def literal_tokens(value):
+    """Return the set of tokens required in any text matching an
+    expression. A token is ("word", w) for a word with spaces on both
+    sides, ("prefix", w) and ("suffix", w) for a word only followed
+    or only preceded by something other than a space.
+    """
+    runs = literal_runs(value)
+    if runs is None or flags_regex.search(value):
+        return frozenset()
+
+    tokens = set()
+    for run in runs:
+        words = run.split(" ")
+        last = len(words) - 1
+        for position, word in enumerate(words):
+            if not word:
+                continue
+            if 0 < position < last:
+                tokens.add(("word", word))
+            elif position:
+                tokens.add(("prefix", word))
+            elif last:
+                tokens.add(("suffix", word))
+    return frozenset(tokens)
+
+
+class LiteralIndex(object):
+    """Inverted index from required tokens to expressions."""
+
+    def __init__(self, token_sets):
+        self.required = [len(tokens) for tokens in token_sets]
+        self.always = [i for i, tokens in enumerate(token_sets) if not tokens]
+        self.index = {
+            kind: collections.defaultdict(list)
+            for kind in ("word", "prefix", "suffix")
+        }
+        for i, tokens in enumerate(token_sets):
+            for kind, word in tokens:
+                self.index[kind][word].append(i)
+        self.lengths = {
+            kind: sorted({len(word) for word in self.index[kind]})
+            for kind in ("prefix", "suffix")
+        }
+
+    def candidates(self, text):
+        """Return sorted indexes of expressions whose required tokens
+        all occur in the text.
+        """
+        words = self.index["word"]
+        prefixes, suffixes = self.index["prefix"], self.index["suffix"]
+        found = set()
+
+        for word in set(text.split(" ")):
+            if word in words:
+                found.add(("word", word))
+            for length in self.lengths["prefix"]:
+                if length > len(word):
+                    break
+                if word[:length] in prefixes:
+                    found.add(("prefix", word[:length]))
+            for length in self.lengths["suffix"]:
+                if length > len(word):
+                    break
+                if word[-length:] in suffixes:
+                    found.add(("suffix", word[-length:]))
+
+        counts = {}
+        for kind, word in found:
+            for i in self.index[kind][word]:
+                counts[i] = counts.get(i, 0) + 1
+        return sorted(
+            self.always
+            + [i for i, count in counts.items() if count == self.required[i]]
+        )
+
+
+try:
+    import re._parser as sre_parse
+except ImportError:
+    import sre_parse
+
+
+class _Unbounded(Exception):
+    pass
+
+
+def surface_forms(value, limit=64):
+    """Return every text an expression without entity slots matches
+    in full, or None if there are more than limit of them or the
+    expression uses anything but literals, groups, alternations,
+    single character classes and bounded repeats.
+    """
+    try:
+        parsed = sre_parse.parse(value)
+    except Exception:
+        return None
+    if flags_regex.search(value):
+        return None
+    try:
+        return sorted(set(_expand(list(parsed), limit)))
+    except _Unbounded:
+        return None
+
+
+def _expand(items, limit):
+    forms = [""]
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            options = [chr(av)]
+        elif op is sre_parse.SUBPATTERN:
+            options = _expand(list(av[-1]), limit)
+        elif op is sre_parse.BRANCH:
+            options = [
+                form for branch in av[1] for form in _expand(list(branch), limit)
+            ]
+        elif op is sre_parse.IN:
+            if any(kind is not sre_parse.LITERAL for kind, _ in av):
+                raise _Unbounded
+            options = [chr(char) for _, char in av]
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            low, high, item = av
+            if high > 4:
+                raise _Unbounded
+            once = _expand(list(item), limit)
+            options, repeated = [], [""]
+            for count in range(high + 1):
+                if count >= low:
+                    options += repeated
+                repeated = [r + o for r in repeated for o in once]
+                if len(repeated) > limit:
+                    raise _Unbounded
+        else:
+            raise _Unbounded
+        forms = [form + option for form in forms for option in options]
+        if len(forms) > limit:
+            raise _Unbounded
+    return forms
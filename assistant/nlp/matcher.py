@@ -0,0 +1,312 @@
+"""Compiled intent matcher."""
+
+import re
+import time
+import bisect
+import threading
+import collections
+
+from .literals import LiteralIndex, surface_forms
+
+
+Match = collections.namedtuple(
+    "Match", ["intent", "expression", "entities", "end"]
+)
+
+slots_regex = re.compile(r"<<.*?>>|<.*?>")
+
+# guards call counters and usage rows, which matchers share
+_lock = threading.Lock()
+
+
+def phrase_key(text):
+    """Text as looked up in the phrase table: lowercase, without
+    leading, trailing or repeated whitespace.
+    """
+    return " ".join(text.lower().split())
+
+
+def original_end(text, end):
+    """Position in text of the end position of its phrase_key."""
+    position = 0
+    for word in re.finditer(r"\S+", text):
+        length = len(word.group())
+        if position + length >= end:
+            return word.start() + end - position
+        position += length + 1
+    return len(text)
+
+
+def slot_regex(value, capture=True):
+    """Convert a skill expression into a regex. Entity slots are
+    captured by groups named s0, s1, ... or left uncaptured.
+    """
+    counter = iter(range(len(value)))
+
+    def replace(match):
+        group = f"?P<s{next(counter)}>" if capture else "?:"
+        if match.group().startswith("<<"):
+            return f"({group}.*)"
+        return f"({group}[a-zA-Z0-9_]*)"
+
+    return slots_regex.sub(replace, value)
+
+
+class IntentMatcher(object):
+    """Find the highest priority expression matching a text.
+
+    Expressions keep the skills' OrderedDict order. Expressions whose
+    required literal tokens are missing from the text are never tried,
+    and if only a few candidates are left they are scanned one by one.
+    Otherwise a single combined pattern of all expressions decides in
+    one pass whether anything matches at all. If it does, the winner is
+    narrowed down by bisection over combined patterns of the lower and
+    upper halves (compiled on first use), and a small leaf range is
+    scanned with per-expression patterns.
+
+    Every text an expression without entity slots matches in full is
+    looked up in `phrases`, by `phrase_key`, before any regex runs. The
+    table holds the result of a regular match of each such text, so a
+    higher priority expression matching it as well still wins. Texts
+    won by an expression with slots are left to the regular match.
+
+    Hits of every expression and, on a sample of calls, the time its
+    pattern takes are counted in usage rows shared by expression value
+    (see `attach`). Every `reorder_every` calls the `hot_size`
+    expressions with the most hits per unit of cost are picked and
+    tried first. A hot expression that matches only wins if no higher
+    priority expression matches as well, so the result is always the
+    same as in priority order. Only expressions that can overlap with it
+    on this text are checked: higher priority candidates, whose required
+    literals the text contains, one by one if there are a few or else
+    with one combined pattern of exactly them.
+    """
+
+    leaf_size = 8
+    scan_limit = 32
+    hot_size = 8
+    reorder_every = 256
+    sample_every = 16
+    # combined patterns of candidates above a hot expression kept
+    overlap_limit = 256
+
+    def __init__(self, expressions, previous=None):
+        self.entries = [
+            (intent, expr)
+            for intent, exprs in expressions.items()
+            for expr in exprs
+        ]
+        self.index = LiteralIndex([expr["tokens"] for _, expr in self.entries])
+        self._patterns = {}
+        if previous is not None:
+            # patterns of expressions kept by a reload are not compiled
+            # again, per-expression patterns only depend on the value
+            compiled = {
+                previous.entries[index][1]["value"]: pattern
+                for index, pattern in previous._patterns.items()
+            }
+            for index, (_, expr) in enumerate(self.entries):
+                if expr["value"] in compiled:
+                    self._patterns[index] = compiled[expr["value"]]
+        self._sources = [
+            slot_regex(expr["value"], capture=False)
+            for _, expr in self.entries
+        ]
+        self._nodes = {}
+        self._overlaps = {}
+        self._node(0, len(self.entries))
+        self.phrases = self._phrase_table()
+        self.attach({})
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getstate__(self):
+        # compiled patterns are rebuilt on demand after unpickling,
+        # usage is attached again by the owner
+        state = self.__dict__.copy()
+        state["_patterns"], state["_nodes"], state["_overlaps"] = {}, {}, {}
+        state["usage"], state["_rows"], state["hot"] = {}, [], []
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.attach({})
+
+    def _phrase_table(self):
+        """Map full texts of expressions without slots to the index
+        and the match of the expression winning them, unless it has
+        slots.
+        """
+        phrases = {}
+        for _, expr in self.entries:
+            if expr["entity_names"]:
+                continue
+            for text in surface_forms(expr["value"]) or ():
+                key = phrase_key(text)
+                if key in phrases:
+                    continue
+                for index in self.index.candidates(key):
+                    found = self._pattern(index).search(key)
+                    if found:
+                        if not self.entries[index][1]["entity_names"]:
+                            match = self._match(index, found)
+                            phrases[key] = (index, match)
+                        break
+        return phrases
+
+    def attach(self, usage):
+        """Count usage in a dict of expression value to [hits, cost in
+        ns, cost samples], shared with other matchers and persisted by
+        the owner, and order hot expressions by it.
+        """
+        self.usage = usage
+        self._rows = [
+            usage.setdefault(expr["value"], [0, 0, 0])
+            for _, expr in self.entries
+        ]
+        self.calls = 0
+        self.reorder()
+
+    def reorder(self):
+        """Pick the expressions to try first by hits per cost."""
+        def score(index):
+            hits, cost, samples = self._rows[index]
+            # patterns never timed count as 1us
+            return hits / (cost / samples if samples else 1000)
+
+        used = [i for i, row in enumerate(self._rows) if row[0]]
+        self.hot = sorted(used, key=lambda i: (-score(i), i))[:self.hot_size]
+
+    def _pattern(self, index):
+        """Pattern of a single expression capturing its entities."""
+        try:
+            return self._patterns[index]
+        except KeyError:
+            _, expr = self.entries[index]
+            pattern = re.compile(slot_regex(expr["value"]))
+            self._patterns[index] = pattern
+            return pattern
+
+    def _node(self, start, stop):
+        """Combined pattern of expressions from start to stop."""
+        try:
+            return self._nodes[start, stop]
+        except KeyError:
+            pattern = re.compile(
+                "|".join(f"(?:{s})" for s in self._sources[start:stop])
+                or "(?!)"
+            )
+            self._nodes[start, stop] = pattern
+            return pattern
+
+    def match(self, text):
+        """Return a Match of the highest priority expression found
+        in the text or None.
+        """
+        found = self.phrases.get(phrase_key(text))
+        if found:
+            index, match = found
+            with _lock:
+                self._rows[index][0] += 1
+            # callers fill entities in
+            if text == phrase_key(text):
+                return match._replace(entities={})
+            return match._replace(
+                entities={}, end=original_end(text, match.end)
+            )
+
+        with _lock:
+            self.calls += 1
+            calls = self.calls
+        if calls % self.reorder_every == 0:
+            self.reorder()
+        sample = calls % self.sample_every == 0
+
+        if len(self.entries) <= self.scan_limit:
+            candidates = range(len(self.entries))
+        else:
+            candidates = self.index.candidates(text)
+
+        for index in self.hot:
+            position = bisect.bisect_left(candidates, index)
+            if position == len(candidates) or candidates[position] != index:
+                continue
+            found = self._search(index, text, sample)
+            if found:
+                # a higher priority expression matching too still wins
+                return (
+                    self._above(candidates[:position], index, text, sample)
+                    or self._result(index, found)
+                )
+
+        return self._first(candidates, len(self.entries), text, sample)
+
+    def _above(self, candidates, stop, text, sample=False):
+        """Match of the first of candidates above a hot expression."""
+        if len(candidates) <= self.scan_limit:
+            return self._scan(candidates, text, sample)
+
+        key = tuple(candidates)
+        pattern = self._overlaps.get(key)
+        if pattern is None:
+            if len(self._overlaps) >= self.overlap_limit:
+                self._overlaps.clear()
+            pattern = re.compile(
+                "|".join(f"(?:{self._sources[i]})" for i in candidates)
+            )
+            self._overlaps[key] = pattern
+        if pattern.search(text):
+            return self._first(candidates, stop, text, sample)
+
+    def _first(self, candidates, stop, text, sample=False):
+        """Match of the first of sorted candidates below stop."""
+        if len(candidates) <= self.scan_limit:
+            return self._scan(candidates, text, sample)
+
+        start = 0
+        if not self._node(start, stop).search(text):
+            return None
+
+        while stop - start > self.leaf_size:
+            middle = (start + stop) // 2
+            first = candidates[bisect.bisect_left(candidates, start)]
+            if first < middle and self._node(start, middle).search(text):
+                stop = middle
+            else:
+                start = middle
+
+        return self._scan(range(start, stop), text, sample)
+
+    def _search(self, index, text, sample=False):
+        if not sample:
+            return self._pattern(index).search(text)
+        started = time.perf_counter_ns()
+        found = self._pattern(index).search(text)
+        elapsed = time.perf_counter_ns() - started
+        row = self._rows[index]
+        with _lock:
+            row[1] += elapsed
+            row[2] += 1
+        return found
+
+    def _scan(self, indexes, text, sample=False):
+        for index in indexes:
+            found = self._search(index, text, sample)
+            if found:
+                return self._result(index, found)
+
+    def _result(self, index, found):
+        with _lock:
+            self._rows[index][0] += 1
+        return self._match(index, found)
+
+    def _match(self, index, found):
+        intent, expr = self.entries[index]
+        groups = [f"s{i}" for i in range(len(expr["entity_names"]))]
+        entities = {
+            name: found.group(group) or ""
+            for name, group in zip(expr["entity_names"], groups)
+        }
+        end = found.end(groups[-1]) if groups else found.end()
+        return Match(intent, expr, entities, end)
@@ -4,23 +4,37 @@ import re
 
 from .nlu import NaturalLanguageUnderstander
 
+SEPARATORS = (" and also ", " and ", " also ")
+separators_regex = re.compile("|".join(SEPARATORS))
+
 
 class NaturalLanguageProcessor(object):
-    def __init__(self):
-        self.nlu = NaturalLanguageUnderstander()
-        self.completed = []
-        self.previous = []
+    def __init__(self, cache_size=256, scope=None):
+        self.nlu = NaturalLanguageUnderstander(
+            cache_size=cache_size, scope=scope
+        )
+        # structures handled during the current utterance
+        self.completed = set()
+        self.previous = set()
 
     def structs(self, text):
         """Returns a generator of one or more TextStructure objects each of which
         corresponds to a unique intent found in the text.
+
+        Growing interim transcripts repeat their earlier segments, which
+        are answered by the understander's cache.
         """
-        for item in self.completed:
-            text = text.replace(item.text, "")
-        parts = re.split(" and also | and | also ", text)
+        for item_text in self.completed_texts():
+            text = text.replace(item_text, "")
+        parts = separators_regex.split(text)
         for part in parts:
             yield self.nlu.understand(part)
 
+    def completed_texts(self):
+        """Unique texts of completed structures, longest first."""
+        texts = {item.text for item in self.completed}
+        return sorted(texts, key=lambda text: (-len(text), text))
+
     def context_structs(self, text):
         for struct in self.structs(text):
             pass  # if struct.intent is None and struct.similarTo:
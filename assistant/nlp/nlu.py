@@ -1,88 +1,128 @@
 #!/usr/bin/env python3
 
-import re
-
 from .text_structure import TextStructure
-from ..skills import expressions, entities
+from .grammar import (  # noqa: F401
+    Grammar,
+    load_grammar,
+    scoped_grammar,
+    prepare_regex_expressions,
+)
+from ..skills import entities, before_reload
+from ..utils import LRUCache, metrics
+
 
+grammar = load_grammar()
+processed_exprs = grammar.expressions
 
-def prepare_regex_expressions():
-    """Convert expressions defined in skills
-    into a proper regex format.
+
+def reload_grammar(names, manifest, entities, capabilities):
+    """Build the grammar of reloaded skills and return the function
+    swapping it in, understanders built with the default expressions
+    pick it up on their next call.
     """
-    processed_exprs = {}
-    entities_regex = re.compile(r"<{1,2}(.*?)>{1,2}")
-
-    for intent, exprs in expressions.items():
-        for expr in exprs:
-            # extract entities
-            entity_names = re.findall(entities_regex, expr)
-
-            # create search regex
-            regex = re.sub(r"<<.*?>>", r"(.*)", expr)  # "(.*?)"
-            regex = re.sub(r"<.*?>", r"([a-zA-Z0-9_]*)", regex)
-
-            result = {
-                "value": expr,
-                "regex": regex,
-                "entity_names": entity_names,
-            }
-            try:
-                processed_exprs[intent].append(result)
-            except KeyError:
-                processed_exprs[intent] = [result]
-    return processed_exprs
+    built = load_grammar(
+        manifest=manifest,
+        entities=entities,
+        capabilities=capabilities,
+        previous=grammar,
+    )
 
+    def swap():
+        global grammar
+        grammar = built
 
-processed_exprs = prepare_regex_expressions()
+    return swap
+
+
+before_reload(reload_grammar)
 
 
 class NaturalLanguageUnderstander:
     """One-off Natural Language Understander.
+
+    Results are memoized by lowercased text in an LRU cache of
+    `cache_size` entries (0 disables it), see `cache.info()`.
+
+    With `scope`, a tuple of interface kind and device role such as
+    ("voice", "pc"), only intents that can run there are searched.
     """
 
-    def __init__(self, expressions=processed_exprs, custom_entities=entities):
-        self.expressions = expressions
-        self.custom_entities = custom_entities
+    def __init__(
+        self,
+        expressions=processed_exprs,
+        custom_entities=entities,
+        cache_size=256,
+        scope=None,
+    ):
+        self.scope = scope
+        self.cache = LRUCache(cache_size)
+        metrics.register(
+            "nlu_cache" + (f".{scope[0]}" if scope else ""), self.cache.info
+        )
+        if expressions is processed_exprs and custom_entities is entities:
+            # follow the global grammar, which skill reloads replace
+            self._grammar = None
+        else:
+            self._grammar = Grammar(expressions, custom_entities)
+        self._cached_grammar = self.grammar
+
+    @property
+    def grammar(self):
+        return scoped_grammar(self._grammar or grammar, self.scope)
+
+    @property
+    def expressions(self):
+        return self.grammar.expressions
+
+    @property
+    def custom_entities(self):
+        return self.grammar.entities
 
     def understand(self, text):
         """Returns an TextStructure object that will contain
         intent, entitites, etc. of inputted text.
         """
         text = text.lower()
-        result = self.regex_undestand(text)
+        grammar = self.grammar
+        if grammar is not self._cached_grammar:
+            # skills were reloaded, cached results are stale
+            self.cache.clear()
+            self._cached_grammar = grammar
+        struct = self.cache.get(text)
+
+        if struct is None:
+            struct = self._understand(text, grammar)
+            if grammar is self._cached_grammar:
+                self.cache.put(text, struct)
+
+        # callers are free to modify the returned structure
+        return struct.copy()
+
+    def _understand(self, text, grammar):
+        result = self.regex_undestand(text, grammar)
 
         # custom entitites update (they are complete/final by default)
-        custom_entities = self.find_custom_entities(text)
+        custom_entities = self.find_custom_entities(text, grammar)
         result["entities"].update(custom_entities)
         result.update({"complete_entities": set(custom_entities.keys())})
+        result["intent_info"] = grammar.intents.get(result["intent"])
 
         return TextStructure(result)
 
-    def regex_undestand(self, text):
+    def regex_undestand(self, text, grammar=None):
         """Extract intent and entities from a text
         based on regex expressions.
         """
-        for intent in self.expressions:
-            for expr in self.expressions[intent]:
-                " Match text"
-                p = re.compile(expr["regex"])
-                found = p.findall(text)
-
-                if found:
-                    x = found[0]
-                    if "" in x:
-                        x = [x]
-                    entities = dict(zip(expr["entity_names"], x))
-                    end = text.find(x[-1]) + len(x[-1])
-
-                    return {
-                        "text": text,
-                        "expression": expr["value"],
-                        "intent": intent,
-                        "entities": entities,
-                        "end": end,
-                    }
+        match = (grammar or self.grammar).matcher.match(text)
+
+        if match:
+            return {
+                "text": text,
+                "expression": match.expression["value"],
+                "intent": match.intent,
+                "entities": match.entities,
+                "end": match.end,
+            }
         return {
             "text": text,
             "expression": None,
@@ -91,20 +131,11 @@ class NaturalLanguageUnderstander:
             "end": None,
         }
 
-    def find_custom_entities(self, text):
+    def find_custom_entities(self, text, grammar=None):
         """Extract entities from a text by matching them
         with the ones specifies in `custom_entities`.
         """
-        result = dict()
-
-        for key, ents in self.custom_entities.items():
-            regex = "|".join(ents)
-            match = re.findall(regex, text)
-
-            if match:
-                result.update({key: match[0]})
-
-        return result
+        return (grammar or self.grammar).gazetteer.find(text)
 
 
 if __name__ == "__main__":
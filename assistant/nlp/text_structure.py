@@ -1,14 +1,30 @@
-import re
 from tabulate import tabulate
 
-from assistant.skills import expressions
+from assistant.utils import diagnostics
 
 
 class TextStructure(object):
     """Text structure object takes the output of 'NLU.understand' function
-    and initializes a convenient to-use object
+    and initializes a convenient to-use object.
+
+    Structures are equal and hash the same if they have the same intent,
+    subintent and entities, so they should not be modified while kept
+    in a set or used as dict keys.
     """
 
+    __slots__ = (
+        "text",
+        "intent",
+        "subintent",
+        "entities",
+        "complete_entities",
+        "expression",
+        "end",
+        "intent_info",
+        "confidence",
+        "prepared",
+    )
+
     def __init__(self, result):
         self.text = result["text"]
         self.intent, self.subintent = None, None
@@ -24,6 +40,11 @@ class TextStructure(object):
         self.complete_entities = result["complete_entities"]
         self.expression = result["expression"]
         self.end = result["end"]
+        # grammar metadata of the intent, see nlp.grammar.intent_table
+        self.intent_info = result.get("intent_info")
+        self.confidence = None
+        # result of the skill's prepare step, see skills._speculation
+        self.prepared = None
 
     def __str__(self):
         result = [
@@ -36,14 +57,28 @@ class TextStructure(object):
         return tabulate(result, tablefmt="fancy_grid")  # rst
 
     def __eq__(self, other):
-        return all(
-            (
-                self.intent == other.intent,
-                self.subintent == other.subintent,
-                self.entities == other.entities,
-            )
+        if not isinstance(other, TextStructure):
+            return NotImplemented
+        return (
+            self.intent == other.intent
+            and self.subintent == other.subintent
+            and self.entities == other.entities
+        )
+
+    def __hash__(self):
+        return hash(
+            (self.intent, self.subintent, frozenset(self.entities.items()))
         )
 
+    def copy(self):
+        """Return a copy that does not share entities with the original."""
+        other = object.__new__(type(self))
+        for name in self.__slots__:
+            setattr(other, name, getattr(self, name))
+        other.entities = dict(self.entities)
+        other.complete_entities = set(self.complete_entities)
+        return other
+
     def update(self, other):
         """Merge entities of two text structures.
         Input 'result' overwrites the existing 'self'
@@ -51,6 +86,7 @@ class TextStructure(object):
         """
         if self.intent is None and other.intent is not None:
             self.intent = other.intent
+            self.intent_info = other.intent_info
             self.confidence = other.confidence
         for key in other.entities:
             if key in self.entities:
@@ -70,36 +106,27 @@ class TextStructure(object):
         required to perform an action.
         Used for FastAssist feature.
         """
-        if not self.intent:
+        if not self.intent or self.intent_info is None:
             return False
-
-        if self.subintent:
-            similar_expr = expressions[".".join((self.intent, self.subintent))]
-        else:
-            similar_expr = expressions[self.intent]
+        info = self.intent_info
 
         # if intent has no entities at all:
-        if all("<" not in e for e in similar_expr):
+        if not info.has_entities:
             return True
 
         # if all required entities are present
-        required_entities = set(
-            re.findall(r"<{1,2}(.*?)>{1,2}", similar_expr[0])
-        )
-
-        if self.complete_entities == required_entities:
+        if self.complete_entities == info.required:
             return True
 
-        present_entities = set(self.entities.keys())
-        if required_entities.issubset(present_entities):
+        if info.required.issubset(self.entities):
             # if all entities are fixed <>
-            if all("<<" not in e for e in similar_expr):
+            if not info.open_ended:
                 return True
             # if last entity is <> and?
-            if "<<" not in re.findall(r"<{1,2}.*?>{1,2}", self.expression)[-1]:
+            if not info.last_open.get(self.expression):
                 return True
             # if last is <<>> and string is longer than postion of last >>
             if self.end < len(self.text) and self.text[-1] != "a":
-                print(self.end, len(self.text))
+                diagnostics.debug("end %s of %s", self.end, len(self.text))
                 return True
         return False
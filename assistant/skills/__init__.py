@@ -2,52 +2,229 @@
 
 import os
 import importlib
+import threading
+import traceback
 import collections
-from contextlib import suppress
+
+from ._manifest import load_manifest, list_skills, skill_hash
+from ._registry import SkillRegistry
+from ._executor import SkillExecutor, cancelled  # noqa: F401
+from ._reload import unload, watch
+from ._speculation import Speculator
+from ._workers import WorkerPool
+from ..utils import colored, diagnostics, metrics
 
 # get file dir path
 dir_path = os.path.dirname(os.path.realpath(__file__))
 
 # get skill names
-skill_names = [
-    name.replace(".py", "") for name in os.listdir(dir_path)
-    if not name.startswith("_") and (name.endswith(".py") or "." not in name)
-]
+skill_names = list_skills(dir_path)
+
+# regex and entities of skills are read from the manifest, skill
+# modules are only imported when one of their intents is dispatched
+manifest = load_manifest(__name__, dir_path, skill_names)
+
+
+def load_skill(name):
+    """Import skill by name."""
+    return importlib.import_module(f".{name}", __name__)
+
+
+def collect(manifest, names):
+    """Merge expressions, entities and capabilities of skills'
+    intents.
+    """
+    expressions = collections.OrderedDict()
+    entities = {}
+    capabilities = {}
+    for name in names:
+        # update regular expression for a skill
+        expressions.update(manifest[name]["regex"])
+
+        # update custom entitites if defined in a skill
+        entities.update(manifest[name]["entities"])
+
+        # interfaces and devices intents are limited to
+        for intent in manifest[name]["regex"]:
+            function = intent.split(".")[0]
+            if function in manifest[name]["capabilities"]:
+                capabilities[intent] = manifest[name]["capabilities"][function]
+    return expressions, entities, capabilities
+
+
+expressions, entities, capabilities = collect(manifest, skill_names)
+registry = SkillRegistry(load_skill)
+metrics.register("skills", registry.stats)
+
+
+def intents(names, manifest):
+    """(intent, skill, has prepare) of every intent of skills in names,
+    as registered in the registry.
+    """
+    return [
+        (intent, name, "prepare_" + intent.split(".")[0]
+         in manifest[name]["prepare"])
+        for name in names
+        for intent in manifest[name]["regex"]
+    ]
+
+
+registry.update(add=intents(skill_names, manifest))
+
+_reload_lock = threading.Lock()
+_reload_builders = []
+_reload_listeners = []
 
-expressions = collections.OrderedDict()
-entities = {}
 
-for name in skill_names:
-    # import skill by name
-    skill = importlib.import_module(f".{name}", __name__)
+def on_reload(callback):
+    """Call callback(names) after skills in names were reloaded."""
+    _reload_listeners.append(callback)
 
-    # update regular expression for a skill
-    expressions.update(skill.regex)
 
-    # update custom entitites if defined in a skill
-    with suppress(AttributeError):
-        entities.update(skill.entities)
+def before_reload(build):
+    """Call build(names, manifest, entities, capabilities) with the new
+    manifest, entities and capabilities of skills before they replace
+    the current ones. It returns
+    a function without arguments that swaps in what was built, called
+    right after the registry changed.
+    """
+    _reload_builders.append(build)
 
-    # update defined skill functions
-    globals().update({
-        key: attr for key, attr in skill.__dict__.items()
-        if not key.startswith("_") and callable(attr)
-    })
+
+def reload_skills():
+    """Reload skills that were added, changed or removed since they
+    were loaded and return their names.
+
+    Module level skill names, manifest, expressions, entities and
+    capabilities are replaced by new objects rather than modified,
+    calls in flight keep using what they started with. Everything
+    derived from skills, such as the grammar, is built first and only
+    then swapped in together with the registry.
+    """
+    global skill_names, manifest, expressions, entities, capabilities
+
+    with _reload_lock:
+        names = list_skills(dir_path)
+        changed = [
+            name for name in names
+            if name not in manifest
+            or manifest[name]["hash"] != skill_hash(dir_path, name)
+        ]
+        removed = [name for name in manifest if name not in names]
+        if not changed and not removed:
+            return []
+
+        for name in changed + removed:
+            unload(__name__, name)
+        importlib.invalidate_caches()
+
+        try:
+            new_manifest = load_manifest(__name__, dir_path, names)
+        except Exception:
+            # most likely a skill being edited, wait for the next change
+            traceback.print_exc()
+            return []
+
+        collected = collect(new_manifest, names)
+        try:
+            swaps = [
+                build(changed + removed, new_manifest, *collected[1:])
+                for build in _reload_builders
+            ]
+        except Exception:
+            traceback.print_exc()
+            return []
+
+        # nothing but assignments from here on
+        registry.update(
+            remove=changed + removed, add=intents(changed, new_manifest)
+        )
+        for swap in swaps:
+            swap()
+        skill_names = names
+        manifest = new_manifest
+        expressions, entities, capabilities = collected
+
+        for callback in _reload_listeners:
+            callback(changed + removed)
+
+    print(colored(
+        f"Skills reloaded: {', '.join(changed + removed)}",
+        "OKGREEN",
+        frame=False,
+    ))
+    return changed + removed
 
 
 class Skills:
 
-    def __init__(self, assistant):
+    def __init__(self, assistant, max_workers=8, processes=2):
         self.assistant = assistant
+        self.executor = SkillExecutor(max_workers=max_workers)
+        self.speculator = Speculator(registry, assistant)
+        self.workers = WorkerPool(size=processes)
+        self._configure(skill_names)
+        on_reload(self._configure)
+        metrics.register("executor", self.executor.info)
+        metrics.register("speculation", self.speculator.info)
+        metrics.register("workers", self.workers.info)
+
+    def _configure(self, names):
+        for name in names:
+            if name in manifest:
+                self.executor.configure(
+                    name,
+                    timeout=manifest[name]["timeout"],
+                    concurrency=manifest[name]["concurrency"],
+                )
+                registry.route(
+                    name, self.workers if manifest[name]["process"] else None
+                )
+
+        # (re)start worker processes with out-of-process skills imported
+        remote = [name for name in skill_names if manifest[name]["process"]]
+        if any(name in remote for name in names):
+            self.workers.start(remote)
+
+    def watch(self, interval=2):
+        """Reload skills whenever their source changes."""
+        watch(dir_path, reload_skills, interval)
+
+    def prepare(self, text_struct, interface):
+        """Speculatively prepare an incomplete interim text_struct
+        of interface.
+        """
+        if text_struct.intent in registry:
+            self.speculator.update(text_struct, interface)
+
+    def reset_speculation(self, interface):
+        """Drop prepares of a finished speech stream of interface."""
+        self.speculator.reset(interface)
 
     def handle(self, text_struct, interface):
-        """Call the skill function that corresponds to intent from text_struct."""
+        """Call the skill function that corresponds to intent from
+        text_struct on the executor, return its task without waiting.
+        """
         # unknown intent
         if text_struct.text == ' ': return
 
-        print(text_struct)
+        if diagnostics.enabled():
+            # render a snapshot later, skills may modify entities
+            diagnostics.debug("%s", text_struct.copy())
 
-        if text_struct.intent:
-            # run the function which name matches the intent name
-            skill = globals()[text_struct.intent]
-            skill(text_struct, interface, self.assistant)
+        # intents of a skill removed by a reload are skipped
+        skill = registry.skill(text_struct.intent)
+        if skill is not None:
+            # run the function which name matches the intent name, on
+            # a copy as the caller keeps text_struct in a set meanwhile
+            return self.executor.submit(
+                skill,
+                registry.dispatch,
+                (
+                    text_struct.copy(),
+                    interface,
+                    self.assistant,
+                    self.speculator.take(text_struct, interface),
+                ),
+                interface,
+            )
@@ -0,0 +1,271 @@
+"""Executor running skills off the thread that recognized them.
+
+Skills run on a bounded pool of worker threads, so neither the speech
+recognizer nor the telegram dispatcher waits for a skill to finish.
+Every skill has a timeout, counted from when it was submitted, and a
+cap on how many of its calls may run at once, further calls are queued
+until one of them finishes.
+
+Timeouts are enforced by a single watchdog thread waiting for the
+earliest deadline of a heap of running and queued tasks.
+
+Threads can not be killed: a skill that timed out or was cancelled is
+told so by `cancelled()` and its result is dropped, but it keeps its
+worker and its concurrency slot until it returns. A hanging skill thus
+holds at most its concurrency limit of workers, its queued calls time
+out in the queue.
+"""
+
+import time
+import heapq
+import itertools
+import threading
+import traceback
+import collections
+import concurrent.futures
+
+from ..utils import colored
+
+_local = threading.local()
+
+
+def cancelled():
+    """Whether the skill running in this thread was cancelled or timed
+    out. Long running skills may check it to stop early.
+    """
+    task = getattr(_local, "task", None)
+    return task is not None and task.stopped.is_set()
+
+
+class Task(object):
+    """A skill call submitted to the executor."""
+
+    def __init__(self, skill, function, args, interface, timeout):
+        self.skill = skill
+        self.function = function
+        self.args = args
+        self.interface = interface
+        self.timeout = timeout
+        self.future = concurrent.futures.Future()
+        self.stopped = threading.Event()
+        # set once the call returned or was dropped from the queue
+        self.finished = threading.Event()
+        self.released = False
+
+
+class SkillExecutor(object):
+    """Bounded pool of skill workers with per-skill timeouts and
+    concurrency limits.
+
+    `timeout` (seconds, 0 for none) and `concurrency` apply to skills
+    that do not set their own with `configure`.
+    """
+
+    def __init__(self, max_workers=8, timeout=120, concurrency=2):
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.settings = {}
+        self.timeouts = 0
+        self.errors = 0
+        self.cancellations = 0
+        self._pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers, thread_name_prefix="skill"
+        )
+        self._lock = threading.RLock()
+        self._running = collections.Counter()
+        self._pending = collections.defaultdict(collections.deque)
+        self._tasks = set()
+        # (deadline, sequence, task) of tasks with a timeout
+        self._deadlines = []
+        self._sequence = itertools.count()
+        self._wakeup = threading.Condition(self._lock)
+        self._watchdog = None
+        self._closed = False
+
+    def configure(self, skill, timeout=None, concurrency=None):
+        """Set timeout and concurrency limit of a skill,
+        None keeps the default.
+        """
+        self.settings[skill] = (
+            self.timeout if timeout is None else timeout,
+            self.concurrency if concurrency is None else concurrency,
+        )
+
+    def submit(self, skill, function, args, interface):
+        """Run function(*args) as a call of skill, reporting errors to
+        interface unless it is None. Returns the task without waiting.
+        """
+        timeout, limit = self.settings.get(
+            skill, (self.timeout, self.concurrency)
+        )
+        task = Task(skill, function, args, interface, timeout)
+        with self._lock:
+            self._tasks.add(task)
+            start = self._running[skill] < limit
+            if start:
+                self._running[skill] += 1
+            else:
+                self._pending[skill].append(task)
+            if timeout:
+                self._watch(task, time.monotonic() + timeout)
+        if start:
+            self._pool.submit(self._run, task)
+        return task
+
+    def cancel(self, task=None, skill=None):
+        """Cancel a task, every task of skill or every task at all.
+        Queued tasks never run, running ones are told to stop and keep
+        their slot until they return.
+        """
+        with self._lock:
+            tasks = [
+                t for t in self._tasks
+                if (task is None or t is task)
+                and (skill is None or t.skill == skill)
+            ]
+            for t in tasks:
+                self._unqueue(t)
+                t.stopped.set()
+                if t.future.cancel() or not t.future.done():
+                    self.cancellations += 1
+                    if not t.future.done():
+                        t.future.set_exception(
+                            concurrent.futures.CancelledError()
+                        )
+
+    def _unqueue(self, task):
+        """Drop a task that did not start yet, the lock must be held."""
+        if task in self._pending[task.skill]:
+            self._pending[task.skill].remove(task)
+            task.released = True
+            task.finished.set()
+            self._tasks.discard(task)
+
+    def _watch(self, task, deadline):
+        """Expire task at deadline, the lock must be held."""
+        entry = (deadline, next(self._sequence), task)
+        heapq.heappush(self._deadlines, entry)
+        if self._watchdog is None:
+            self._watchdog = threading.Thread(
+                target=self._check_deadlines, name="skill-watchdog",
+                daemon=True,
+            )
+            self._watchdog.start()
+        elif self._deadlines[0][2] is task:
+            # earlier than what the watchdog waits for
+            self._wakeup.notify()
+
+    def _check_deadlines(self):
+        while True:
+            with self._lock:
+                expired = None
+                while expired is None and not self._closed:
+                    if not self._deadlines:
+                        self._wakeup.wait()
+                        continue
+                    deadline, _, task = self._deadlines[0]
+                    if task.future.done():
+                        # finished or cancelled in time
+                        heapq.heappop(self._deadlines)
+                        continue
+                    remaining = deadline - time.monotonic()
+                    if remaining > 0:
+                        self._wakeup.wait(remaining)
+                        continue
+                    heapq.heappop(self._deadlines)
+                    expired = task
+                if self._closed:
+                    return
+            self._expire(expired)
+
+    def _run(self, task):
+        try:
+            with self._lock:
+                # timed out or cancelled while waiting for a worker
+                if (
+                    task.future.done()
+                    or not task.future.set_running_or_notify_cancel()
+                ):
+                    return
+
+            _local.task = task
+            try:
+                result = task.function(*task.args)
+            except Exception as error:
+                self._finish(task, error=error)
+            else:
+                self._finish(task, result=result)
+            finally:
+                _local.task = None
+        finally:
+            self._release(task)
+
+    def _finish(self, task, result=None, error=None):
+        with self._lock:
+            if task.future.done():
+                # timed out or cancelled meanwhile, drop the result
+                return
+            if error is not None:
+                task.future.set_exception(error)
+                self.errors += 1
+            else:
+                task.future.set_result(result)
+
+        if error is not None:
+            traceback.print_exception(type(error), error, error.__traceback__)
+            self._output(task, "Error occured.")
+
+    def _expire(self, task):
+        with self._lock:
+            if task.future.done():
+                return
+            task.future.set_exception(
+                concurrent.futures.TimeoutError(
+                    f"Skill '{task.skill}' timed out"
+                )
+            )
+            self.timeouts += 1
+            self._unqueue(task)
+        task.stopped.set()
+        print(colored(f"Skill '{task.skill}' timed out", frame=False))
+        self._output(task, "Sorry, that takes too long.")
+
+    def _output(self, task, text):
+        if task.interface is None:
+            return
+        try:
+            task.interface.output(text)
+        except Exception:
+            traceback.print_exc()
+
+    def _release(self, task):
+        with self._lock:
+            if task.released:
+                return
+            task.released = True
+            task.finished.set()
+            self._tasks.discard(task)
+            pending = self._pending[task.skill]
+            following = pending.popleft() if pending else None
+            if following is None:
+                self._running[task.skill] -= 1
+        if following is not None:
+            self._pool.submit(self._run, following)
+
+    def info(self):
+        """Return executor statistics."""
+        with self._lock:
+            return {
+                "running": sum(self._running.values()),
+                "queued": sum(len(p) for p in self._pending.values()),
+                "errors": self.errors,
+                "timeouts": self.timeouts,
+                "cancellations": self.cancellations,
+            }
+
+    def shutdown(self, wait=True):
+        self.cancel()
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify()
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,230 @@
+"""Manifest of installed skills.
+
+Holds `regex`, `entities`, the optional settings `timeout`,
+`concurrency` and `process`, names of `prepare_<intent>` functions and
+capability decorators (see `utils.CAPABILITIES`) of functions of every
+skill so that skills do not have to be imported before one of
+their intents is dispatched. They are read from the skill's source
+without importing it when they are literals, otherwise the skill is
+imported once to read them. Entries are reused until the hash of the
+skill's source files changes.
+"""
+
+import os
+import ast
+import json
+import hashlib
+import importlib
+
+from ..utils import CAPABILITIES
+
+MANIFEST_PATH = "assistant/custom/cache/skills.json"
+
+# bump when the manifest format changes
+VERSION = 6
+
+ATTRIBUTES = ("regex", "entities", "timeout", "concurrency", "process")
+
+
+def list_skills(dir_path):
+    """Names of skills in dir_path, every module or package
+    not starting with an underscore.
+    """
+    return [
+        name.replace(".py", "") for name in os.listdir(dir_path)
+        if not name.startswith("_") and (name.endswith(".py") or "." not in name)
+    ]
+
+
+def skill_files(dir_path, name):
+    """Source files of a skill module or package."""
+    path = os.path.join(dir_path, name)
+    if os.path.isfile(path + ".py"):
+        return [path + ".py"]
+    return sorted(
+        os.path.join(root, file)
+        for root, _, names in os.walk(path)
+        for file in names
+        if file.endswith(".py")
+    )
+
+
+def skill_hash(dir_path, name):
+    """Hash of the source files of a skill module or package."""
+    digest = hashlib.sha1()
+    for file in skill_files(dir_path, name):
+        digest.update(os.path.relpath(file, dir_path).encode())
+        with open(file, "rb") as source:
+            digest.update(source.read())
+    return digest.hexdigest()
+
+
+def decorator_name(node):
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+
+
+def module_file(path, module):
+    """File of module relative to the package directory path,
+    None if there is none.
+    """
+    base = os.path.join(path, *module.split(".")) if module else path
+    for candidate in (base + ".py", os.path.join(base, "__init__.py")):
+        if os.path.isfile(candidate):
+            return candidate
+
+
+def read_module(file, seen=None):
+    """Return literal values of module-level names of the module in
+    file, None for values that are not literals, and capability
+    decorators of its functions.
+
+    Names the module imports from modules of its own package, with
+    `from .module import *` or by name, are read from those modules,
+    so exactly what importing it would define is found.
+    """
+    seen = set() if seen is None else seen
+    seen.add(file)
+    values, functions = {}, {}
+    with open(file) as source:
+        tree = ast.parse(source.read(), file)
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom) and node.level:
+            path = os.path.dirname(file)
+            for _ in range(node.level - 1):
+                path = os.path.dirname(path)
+            imported = module_file(path, node.module)
+            if imported is None or imported in seen:
+                continue
+            other_values, other_functions = read_module(imported, seen)
+            for alias in node.names:
+                if alias.name == "*":
+                    names = {
+                        name: name
+                        for name in list(other_values) + list(other_functions)
+                        if not name.startswith("_")
+                    }
+                else:
+                    names = {alias.name: alias.asname or alias.name}
+                for name, bound in names.items():
+                    if name in other_values:
+                        values[bound] = other_values[name]
+                        functions.pop(bound, None)
+                    elif name in other_functions:
+                        functions[bound] = other_functions[name]
+                        values.pop(bound, None)
+        elif isinstance(node, ast.FunctionDef):
+            functions[node.name] = [
+                decorator_name(decorator)
+                for decorator in reversed(node.decorator_list)
+                if decorator_name(decorator) in CAPABILITIES
+            ]
+            values.pop(node.name, None)
+        elif isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    try:
+                        values[target.id] = ast.literal_eval(node.value)
+                    except (ValueError, TypeError, SyntaxError):
+                        values[target.id] = None
+                    functions.pop(target.id, None)
+    return values, functions
+
+
+def read_literals(file):
+    """Return literal module-level ATTRIBUTES of the module in file,
+    names of prepare functions under "prepare" and capabilities of
+    functions under "capabilities", see `read_module`.
+    """
+    values, functions = read_module(file)
+    found = {
+        attribute: values[attribute]
+        for attribute in ATTRIBUTES
+        if attribute in values
+    }
+    found["prepare"] = sorted(
+        name for name in functions if name.startswith("prepare_")
+    )
+    found["capabilities"] = {
+        name: capabilities
+        for name, capabilities in functions.items()
+        if capabilities
+    }
+    return found
+
+
+def describe(package, dir_path, name, digest):
+    """Return the manifest entry of a skill."""
+    file = module_file(dir_path, name)
+    found = read_literals(file) if file else {}
+
+    if found.get("regex") is None or any(
+        attribute in found and found[attribute] is None
+        for attribute in ATTRIBUTES[1:]
+    ):
+        # not a literal, let the skill compute it
+        skill = importlib.import_module(f".{name}", package)
+        found = {
+            attribute: getattr(skill, attribute)
+            for attribute in ATTRIBUTES
+            if hasattr(skill, attribute)
+        }
+        found["prepare"] = [
+            name for name in dir(skill) if name.startswith("prepare_")
+        ]
+        found["capabilities"] = {
+            name: list(getattr(skill, name).capabilities)
+            for name in dir(skill)
+            if hasattr(getattr(skill, name), "capabilities")
+        }
+
+    # round trip through json to store exactly what is loaded next time
+    return json.loads(
+        json.dumps(
+            {
+                "hash": digest,
+                "regex": found["regex"],
+                "entities": found.get("entities", {}),
+                "timeout": found.get("timeout"),
+                "concurrency": found.get("concurrency"),
+                "process": bool(found.get("process")),
+                "prepare": sorted(found["prepare"]),
+                "capabilities": found["capabilities"],
+            },
+            default=sorted,
+        )
+    )
+
+
+def load_manifest(package, dir_path, names, path=MANIFEST_PATH):
+    """Return a dict of skill name to its manifest entry, describing
+    again only skills that are new or whose source changed.
+    """
+    try:
+        with open(path) as file:
+            cached = json.load(file)
+        if cached["version"] != VERSION:
+            raise ValueError
+        cached = cached["skills"]
+    except (OSError, ValueError, KeyError):
+        cached = {}
+
+    manifest = {}
+    for name in names:
+        digest = skill_hash(dir_path, name)
+        entry = cached.get(name)
+        if entry is None or entry["hash"] != digest:
+            entry = describe(package, dir_path, name, digest)
+        manifest[name] = entry
+
+    if manifest != cached:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + ".tmp", "w") as file:
+                json.dump({"version": VERSION, "skills": manifest}, file)
+            os.replace(path + ".tmp", path)
+        except OSError:
+            pass
+    return manifest
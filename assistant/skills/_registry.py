@@ -0,0 +1,199 @@
+"""Registry of skill handlers with dispatch timing."""
+
+import time
+import threading
+import collections
+
+from ..utils import colored
+from ..utils.metrics import Histogram
+
+
+class SkillStats(object):
+    """Dispatch counters and latencies of one intent."""
+
+    def __init__(self, skill):
+        self.skill = skill
+        self.errors = 0
+        self.cpu = 0.0
+        self.wall = Histogram()
+        self._lock = threading.Lock()
+
+    def add(self, wall, cpu, failed):
+        self.wall.add(wall)
+        with self._lock:
+            self.cpu += cpu
+            self.errors += failed
+
+    def info(self):
+        info = self.wall.info()
+        info.update(
+            {
+                "skill": self.skill,
+                "errors": self.errors,
+                "cpu_ms": self.cpu * 1000,
+            }
+        )
+        return info
+
+
+Table = collections.namedtuple("Table", ["skills", "prepares", "handlers"])
+
+
+class SkillRegistry(object):
+    """Map intents to the skills handling them.
+
+    Intents are registered from the skills manifest and resolved to the
+    function named after the intent on first dispatch, when the skill
+    is loaded. Every dispatch is timed with wall and CPU time.
+
+    Routing lives in one table that changes are applied to as a copy,
+    swapped in with a single assignment, so dispatch never sees a
+    reload half done. Only resolved handlers are cached into it.
+    """
+
+    # seconds dispatch waits for a speculative prepare to finish
+    prepare_wait = 2
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._table = Table({}, frozenset(), {})
+        self._routes = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def update(self, remove=(), add=()):
+        """Forget intents of skills in remove, keeping their statistics,
+        then register (intent, skill, prepares) triples of add, where
+        prepares tells whether the skill has a `prepare_<intent>`, and
+        swap in the result at once. A subintent is dropped, intent and
+        intent.subintent are handled by the same function.
+        """
+        with self._lock:
+            table = self._table
+            skills = {
+                intent: skill for intent, skill in table.skills.items()
+                if skill not in remove
+            }
+            prepares = {i for i in table.prepares if i in skills}
+            for intent, skill, prepare in add:
+                intent = intent.split(".")[0]
+                previous = skills.get(intent)
+                if previous is not None and previous != skill:
+                    print(
+                        colored(
+                            f"Intent '{intent}' of skill '{previous}' "
+                            f"is overridden by skill '{skill}'",
+                            frame=False,
+                        )
+                    )
+                skills[intent] = skill
+                if prepare:
+                    prepares.add(intent)
+                else:
+                    prepares.discard(intent)
+                self._stats.setdefault(intent, SkillStats(skill)).skill = skill
+            touched = set(remove) | {skill for _, skill, _ in add}
+            self._swap(skills, prepares, touched)
+
+    def add(self, intent, skill, prepares=False):
+        """Register skill as the handler of intent. Intents are keyed by
+        function name, intent.subintent registers intent.
+        """
+        self.update(add=[(intent, skill, prepares)])
+
+    def remove(self, skill):
+        """Forget intents of skill, keeping their statistics."""
+        self.update(remove=[skill])
+
+    def _swap(self, skills, prepares, touched):
+        """Replace the table keeping resolved handlers of untouched
+        skills, the lock must be held.
+        """
+        handlers = {
+            intent: handler
+            for intent, handler in self._table.handlers.items()
+            if skills.get(intent) == self._table.skills.get(intent)
+            and skills.get(intent) not in touched
+        }
+        self._table = Table(skills, frozenset(prepares), handlers)
+
+    def route(self, skill, pool=None):
+        """Run intents of skill in pool, see `_workers.WorkerPool`,
+        or in this process again if pool is None.
+        """
+        with self._lock:
+            if pool is None:
+                self._routes.pop(skill, None)
+            else:
+                self._routes[skill] = pool
+            table = self._table
+            self._swap(table.skills, table.prepares, {skill})
+
+    def __contains__(self, intent):
+        return intent in self._table.skills
+
+    def skill(self, intent):
+        """Return the name of the skill handling intent, None if none."""
+        return self._table.skills.get(intent)
+
+    def handler(self, intent):
+        """Return the function handling intent, loading its skill."""
+        table = self._table
+        try:
+            return table.handlers[intent]
+        except KeyError:
+            skill = table.skills[intent]
+            routes = self._routes
+            if skill in routes:
+                handler = routes[skill].handler(skill, intent)
+            else:
+                handler = getattr(self._loader(skill), intent)
+            table.handlers[intent] = handler
+            return handler
+
+    def prepares(self, intent):
+        """Whether the skill of intent can prepare it speculatively."""
+        return intent in self._table.prepares
+
+    def preparer(self, intent):
+        """Return the `prepare_<intent>` function, loading its skill."""
+        skill = self._table.skills[intent]
+        routes = self._routes
+        if skill in routes:
+            return routes[skill].preparer(skill, "prepare_" + intent)
+        return getattr(self._loader(skill), "prepare_" + intent)
+
+    def dispatch(self, text_struct, interface, assistant, prepared=None):
+        """Run the handler of text_struct's intent and time it.
+
+        prepared is a task of the executor preparing the same structure,
+        its result is waited for, at most `prepare_wait` seconds or the
+        skill's timeout, and stored in `text_struct.prepared`.
+        """
+        handler = self.handler(text_struct.intent)
+        if prepared is not None:
+            wait = self.prepare_wait
+            if prepared.timeout:
+                wait = min(wait, prepared.timeout)
+            try:
+                text_struct.prepared = prepared.future.result(timeout=wait)
+            except Exception:
+                # prepare failed, was cancelled or is too slow, the
+                # skill does it all
+                pass
+        failed = True
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            result = handler(text_struct, interface, assistant)
+            failed = False
+            return result
+        finally:
+            self._stats[text_struct.intent].add(
+                time.perf_counter() - wall, time.thread_time() - cpu, failed
+            )
+
+    def stats(self):
+        """Return dispatch statistics of every intent."""
+        return {
+            intent: stats.info() for intent, stats in self._stats.items()
+        }
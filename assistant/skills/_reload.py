@@ -0,0 +1,46 @@
+"""Watching skills' source for changes."""
+
+import os
+import sys
+import time
+
+from ._manifest import list_skills, skill_files
+
+
+def stamps(dir_path):
+    """Modification times and sizes of every skill's files."""
+    result = {}
+    for name in list_skills(dir_path):
+        files = skill_files(dir_path, name)
+        try:
+            result[name] = tuple(
+                (file, os.stat(file).st_mtime_ns, os.stat(file).st_size)
+                for file in files
+            )
+        except OSError:
+            # removed while listing, seen on the next poll
+            result[name] = None
+    return result
+
+
+def unload(package, name):
+    """Remove a skill module and its submodules from sys.modules
+    so that the next import reads them again.
+    """
+    module = f"{package}.{name}"
+    for loaded in list(sys.modules):
+        if loaded == module or loaded.startswith(module + "."):
+            del sys.modules[loaded]
+
+
+def watch(dir_path, callback, interval=2):
+    """Call callback whenever files of skills in dir_path are added,
+    changed or removed. Polls every interval seconds, never returns.
+    """
+    last = stamps(dir_path)
+    while True:
+        time.sleep(interval)
+        current = stamps(dir_path)
+        if current != last:
+            last = current
+            callback()
@@ -0,0 +1,123 @@
+"""Speculative preparation of skills on interim transcripts.
+
+A skill opts in by defining `prepare_<intent>(text_struct, assistant)`
+next to its intent function. It must be free of side effects, e.g. a
+search or a weather fetch, and return whatever the intent function
+needs. Once an interim transcript yields the same incomplete structure
+(intent and entities) a few times in a row, prepare is started. The
+final dispatch of an equal structure from the same interface gets the
+result in `text_struct.prepared`, a prepare for anything else is
+dropped.
+
+Prepares run on their own small executor, so they never hold a slot
+of the skills' executor that dispatch would wait for. An intent has at
+most one prepare running: a prepare that is no longer wanted is left to
+finish, stopping it would kill the worker process of an out-of-process
+skill, and no new one starts for the intent until it returns.
+"""
+
+import threading
+
+from ._executor import SkillExecutor
+
+
+class Speculator(object):
+    """Prepare steps of one speech stream."""
+
+    def __init__(self, registry, assistant, stable=2, workers=2, timeout=30):
+        self.registry = registry
+        self.assistant = assistant
+        self.stable = stable
+        # calls are keyed by intent, one at a time each
+        self.executor = SkillExecutor(
+            max_workers=workers, timeout=timeout, concurrency=1
+        )
+        self._seen = {}
+        # intent -> (struct, task, interface) of the wanted prepare
+        self._tasks = {}
+        # intent -> task of a prepare dropped while it runs
+        self._dropped = {}
+        self._lock = threading.Lock()
+
+    def update(self, text_struct, interface):
+        """Start preparing text_struct if it was stable long enough."""
+        intent = text_struct.intent
+        if not self.registry.prepares(intent):
+            return
+
+        with self._lock:
+            previous, count = self._seen.get(intent, (None, 0))
+            count = count + 1 if previous == text_struct else 1
+            self._seen[intent] = (text_struct, count)
+            if count < self.stable:
+                return
+
+            current = self._tasks.get(intent)
+            if current is not None:
+                if current[0] == text_struct:
+                    return
+                # entities changed since, drop the outdated prepare
+                self._drop(self._tasks.pop(intent)[1])
+
+            dropped = self._dropped.get(intent)
+            if dropped is not None:
+                if not dropped.finished.is_set():
+                    # tried again on the next stable interim
+                    return
+                del self._dropped[intent]
+
+            struct = text_struct.copy()
+            task = self.executor.submit(
+                intent, self._prepare, (struct,), interface=None
+            )
+            self._tasks[intent] = (struct, task, interface)
+
+    def _prepare(self, text_struct):
+        prepare = self.registry.preparer(text_struct.intent)
+        return prepare(text_struct, self.assistant)
+
+    def _drop(self, task):
+        """Cancel task unless it started, a running one is left to
+        finish and blocks its intent meanwhile. The lock must be held.
+        """
+        if task.future.running():
+            self._dropped[task.skill] = task
+        else:
+            self.executor.cancel(task)
+
+    def take(self, text_struct, interface):
+        """Return the prepare task of an equal structure started from
+        interface, if any, dropping a prepare of the same intent and
+        interface that does not match.
+        """
+        with self._lock:
+            current = self._tasks.get(text_struct.intent)
+            if current is None or current[2] is not interface:
+                return None
+            del self._tasks[text_struct.intent]
+            self._seen.pop(text_struct.intent, None)
+            struct, task, _ = current
+            if struct == text_struct:
+                return task
+            self._drop(task)
+            return None
+
+    def reset(self, interface):
+        """Drop prepares of interface nothing was dispatched for,
+        at stream end.
+        """
+        with self._lock:
+            for intent, (_, task, started) in list(self._tasks.items()):
+                if started is interface:
+                    del self._tasks[intent]
+                    self._seen.pop(intent, None)
+                    self._drop(task)
+
+    def info(self):
+        """Return statistics of the prepare executor."""
+        info = self.executor.info()
+        with self._lock:
+            info["dropped_running"] = sum(
+                not task.finished.is_set() for task in self._dropped.values()
+            )
+        return info
@@ -0,0 +1,242 @@
+"""Out-of-process skills.
+
+Skills setting `process = True` run in a pool of worker processes that
+are started once with those skills already imported, so that CPU heavy
+skills do not hold the GIL next to the hotword detector. Calls and
+results are pickled, `output`, `input` and any other attribute of the
+interface and the assistant are proxied back to the assistant process.
+
+Unlike threads, a worker process can be killed: a call that timed out
+or was cancelled on the executor kills its worker, which is replaced.
+"""
+
+import queue
+import pickle
+import threading
+import importlib
+import traceback
+import multiprocessing
+
+from ._executor import cancelled
+
+PACKAGE = __name__.rsplit(".", 1)[0]
+
+# workers are forked from a clean process rather than from the
+# assistant, which by then runs threads
+CONTEXT = "forkserver"
+
+
+def _send(conn, message):
+    conn.send_bytes(pickle.dumps(message, pickle.HIGHEST_PROTOCOL))
+
+
+def _receive(conn):
+    return pickle.loads(conn.recv_bytes())
+
+
+class WorkerError(Exception):
+    """Exception raised by a skill in a worker, with its traceback."""
+
+
+class Proxy(object):
+    """Stand-in for the interface or the assistant in a worker."""
+
+    def __init__(self, conn, target):
+        self._conn = conn
+        self._target = target
+
+    def _request(self, *message):
+        _send(self._conn, message)
+        kind, value = _receive(self._conn)
+        if kind == "raise":
+            raise value
+        return kind, value
+
+    def __getattr__(self, name):
+        kind, value = self._request("getattr", self._target, name)
+        if kind == "method":
+            def method(*args, **kwargs):
+                return self._request(
+                    "call", self._target, name, args, kwargs
+                )[1]
+            return method
+        return value
+
+
+def _work(conn, names):
+    """Main loop of a worker process."""
+    for name in names:
+        try:
+            importlib.import_module(f"{PACKAGE}.{name}")
+        except Exception:
+            traceback.print_exc()
+
+    while True:
+        try:
+            _, skill, function, text_struct, with_interface = _receive(conn)
+        except (EOFError, OSError):
+            return
+
+        assistant = Proxy(conn, "assistant")
+        if with_interface:
+            args = (text_struct, Proxy(conn, "interface"), assistant)
+        else:
+            args = (text_struct, assistant)
+
+        try:
+            module = importlib.import_module(f"{PACKAGE}.{skill}")
+            result = getattr(module, function)(*args)
+        except Exception:
+            _send(conn, ("error", traceback.format_exc()))
+            continue
+        try:
+            _send(conn, ("result", result))
+        except (pickle.PicklingError, TypeError, AttributeError):
+            _send(conn, ("result", None))
+
+
+class Worker(object):
+    """A worker process and the parent's end of its pipe."""
+
+    def __init__(self, context, names, generation):
+        self.generation = generation
+        self.conn, child = context.Pipe()
+        self.process = context.Process(
+            target=_work, args=(child, names), daemon=True
+        )
+        self.process.start()
+        child.close()
+
+    def stop(self):
+        self.process.kill()
+        self.conn.close()
+
+
+class WorkerPool(object):
+    """Pre-started worker processes running out-of-process skills."""
+
+    def __init__(self, size=2):
+        self.size = size
+        self.calls = 0
+        self.errors = 0
+        self.restarts = 0
+        self._names = []
+        self._generation = 0
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._context = None
+
+    def start(self, names):
+        """Start workers importing skills in names, replacing running
+        ones, e.g. after those skills were reloaded.
+        """
+        with self._lock:
+            if self._context is None:
+                self._context = multiprocessing.get_context(CONTEXT)
+                if CONTEXT == "forkserver":
+                    self._context.set_forkserver_preload([PACKAGE])
+            self._names = list(names)
+            self._generation += 1
+            stale = []
+            while True:
+                try:
+                    stale.append(self._idle.get_nowait())
+                except queue.Empty:
+                    break
+            for worker in stale:
+                worker.stop()
+            for _ in range(self.size):
+                self._idle.put(self._spawn())
+
+    def _spawn(self):
+        return Worker(self._context, self._names, self._generation)
+
+    def handler(self, skill, function):
+        """Return an intent function running in a worker."""
+        def handle(text_struct, interface, assistant):
+            return self.call(skill, function, text_struct, interface, assistant)
+        return handle
+
+    def preparer(self, skill, function):
+        """Return a prepare function running in a worker."""
+        def prepare(text_struct, assistant):
+            return self.call(skill, function, text_struct, None, assistant)
+        return prepare
+
+    def call(self, skill, function, text_struct, interface, assistant):
+        """Run a skill function in an idle worker, serving its requests
+        to the interface and the assistant until it returns.
+        """
+        while True:
+            try:
+                worker = self._idle.get(timeout=0.1)
+                break
+            except queue.Empty:
+                if cancelled():
+                    return None
+        self.calls += 1
+        healthy = False
+        try:
+            _send(
+                worker.conn,
+                ("call", skill, function, text_struct, interface is not None),
+            )
+            while True:
+                if not worker.conn.poll(0.1):
+                    if cancelled():
+                        # timed out or cancelled, the worker is killed
+                        return None
+                    continue
+
+                message = _receive(worker.conn)
+                if message[0] == "result":
+                    healthy = True
+                    return message[1]
+                if message[0] == "error":
+                    healthy = True
+                    self.errors += 1
+                    raise WorkerError(message[1])
+                target = interface if message[1] == "interface" else assistant
+                self._serve(worker.conn, target, message)
+        except (EOFError, OSError):
+            self.errors += 1
+            raise WorkerError(f"Worker of skill '{skill}' died")
+        finally:
+            if healthy and worker.generation == self._generation:
+                self._idle.put(worker)
+            else:
+                worker.stop()
+                # workers of an older generation were already replaced
+                if worker.generation == self._generation:
+                    self.restarts += 1
+                    with self._lock:
+                        self._idle.put(self._spawn())
+
+    def _serve(self, conn, target, message):
+        """Answer a getattr or call request of a worker."""
+        try:
+            value = getattr(target, message[2])
+            if message[0] == "call":
+                reply = ("value", value(*message[3], **message[4]))
+            elif callable(value):
+                reply = ("method", None)
+            else:
+                reply = ("value", value)
+        except Exception as error:
+            reply = ("raise", error)
+        try:
+            _send(conn, reply)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            _send(conn, ("raise", TypeError(
+                f"'{message[2]}' can not be sent to the skill process"
+            )))
+
+    def info(self):
+        """Return pool statistics."""
+        return {
+            "size": self.size,
+            "idle": self._idle.qsize(),
+            "calls": self.calls,
+            "errors": self.errors,
+            "restarts": self.restarts,
+        }
@@ -1 +1,2 @@
 from .utils import *
+from .cache import LRUCache, memoize
@@ -0,0 +1,225 @@
+"""In-memory caches."""
+
+import time
+import functools
+import threading
+import collections
+import concurrent.futures
+
+from . import metrics
+
+
+class LRUCache(object):
+    """Thread-safe size-bounded mapping with least recently used eviction
+    and hit/miss counters.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        """Return cached value and mark it as recently used."""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store value evicting the least recently used ones if full."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def info(self):
+        """Return cache statistics."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+        }
+
+
+_Entry = collections.namedtuple("_Entry", ["value", "expires", "stale_until"])
+
+# separates positional from keyword arguments in cache keys
+_kwargs_mark = object()
+
+
+def _make_key(args, kwargs):
+    key = args
+    if kwargs:
+        key += (_kwargs_mark,) + tuple(sorted(kwargs.items()))
+    hash(key)
+    return key
+
+
+def memoize(ttl=60, maxsize=128, stale=0, name=None):
+    """Decorator caching results of a data-fetching function.
+
+    Results are kept for `ttl` seconds in an LRU cache of `maxsize`
+    entries. Concurrent calls with the same arguments share a single
+    call of the function. With `stale` > 0 an expired result is still
+    returned for `stale` more seconds while it is fetched again in the
+    background. Exceptions are never cached and calls with unhashable
+    arguments are not cached at all.
+
+    Statistics are registered in `assistant.utils.metrics` under
+    "memoize.<name>", by default the function's qualified name.
+    """
+
+    def decorator(func):
+        return Memoized(func, ttl, maxsize, stale, name)
+
+    return decorator
+
+
+class Memoized(object):
+    """Function wrapped by `memoize`."""
+
+    def __init__(self, func, ttl, maxsize, stale, name=None):
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.ttl = ttl
+        self.stale = stale
+        self.cache = LRUCache(maxsize)
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.coalesced = 0
+        self.errors = 0
+        self._calls = {}
+        # keys refreshed in the background
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        metrics.register(
+            "memoize." + (name or f"{func.__module__}.{func.__qualname__}"),
+            self.info,
+        )
+
+    def __get__(self, instance, owner):
+        # decorated methods get bound like plain functions
+        if instance is None:
+            return self
+        return functools.partial(self, instance)
+
+    def __call__(self, *args, **kwargs):
+        try:
+            key = _make_key(args, kwargs)
+        except TypeError:
+            return self.func(*args, **kwargs)
+
+        entry = self.cache.get(key)
+        if entry is not None:
+            now = time.monotonic()
+            if now < entry.expires:
+                with self._lock:
+                    self.hits += 1
+                return entry.value
+            if now < entry.stale_until:
+                with self._lock:
+                    self.stale_hits += 1
+                    # one refresh per key at a time
+                    refresh = (
+                        key not in self._refreshing and key not in self._calls
+                    )
+                    if refresh:
+                        self._refreshing.add(key)
+                if refresh:
+                    threading.Thread(
+                        target=self._refresh,
+                        args=(key, args, kwargs),
+                        daemon=True,
+                    ).start()
+                return entry.value
+
+        with self._lock:
+            self.misses += 1
+        return self._fetch(key, args, kwargs)
+
+    def _fetch(self, key, args, kwargs):
+        """Call the function, or wait for the same call in flight."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = concurrent.futures.Future()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return call.result()
+
+        try:
+            value = self.func(*args, **kwargs)
+        except BaseException as error:
+            with self._lock:
+                self.errors += 1
+            call.set_exception(error)
+            raise
+        else:
+            now = time.monotonic()
+            self.cache.put(
+                key, _Entry(value, now + self.ttl, now + self.ttl + self.stale)
+            )
+            call.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def _refresh(self, key, args, kwargs):
+        try:
+            self._fetch(key, args, kwargs)
+        except Exception:
+            # keep serving the stale value until it expires
+            pass
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def invalidate(self, *args, **kwargs):
+        """Forget the result of a call, or every result without args."""
+        if args or kwargs:
+            self.cache.pop(_make_key(args, kwargs))
+        else:
+            self.cache.clear()
+
+    def info(self):
+        """Return cache statistics."""
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "size": len(self.cache),
+            "maxsize": self.cache.maxsize,
+        }
@@ -0,0 +1,65 @@
+"""Deferred diagnostics output.
+
+Nothing is formatted unless a sink is enabled with `enable()` (or the
+ASSISTANT_DEBUG environment variable when running the assistant).
+Messages are then rendered and written by a background thread, so the
+caller only pays for putting a record into a queue.
+"""
+
+import sys
+import queue
+import atexit
+import logging
+import logging.handlers
+
+logger = logging.getLogger("assistant.diagnostics")
+logger.setLevel(logging.DEBUG)
+logger.propagate = False
+logger.disabled = True
+
+_listener = None
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that leaves formatting to the listener thread."""
+
+    def prepare(self, record):
+        return record
+
+
+def enable(handler=None):
+    """Start rendering diagnostics into handler (stdout by default)."""
+    global _listener
+    if _listener is not None:
+        return
+    if handler is None:
+        handler = logging.StreamHandler(sys.stdout)
+
+    records = queue.Queue()
+    _listener = logging.handlers.QueueListener(records, handler)
+    _listener.start()
+    logger.addHandler(DeferredQueueHandler(records))
+    logger.disabled = False
+    atexit.register(disable)
+
+
+def disable():
+    """Stop the sink after writing out what was already queued."""
+    global _listener
+    if _listener is None:
+        return
+    logger.disabled = True
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    _listener.stop()
+    _listener = None
+
+
+def enabled():
+    return not logger.disabled
+
+
+def debug(message, *args):
+    """Log a message formatted with args lazily, as logging does."""
+    if not logger.disabled:
+        logger.debug(message, *args)
@@ -0,0 +1,86 @@
+"""Assistant metrics.
+
+Components register a callable returning a JSON-serializable snapshot of
+their statistics under a name. All of them can be queried with
+`snapshot()` and written to a file with `dump()`, which the assistant
+does on shutdown.
+"""
+
+import os
+import json
+import bisect
+import threading
+import collections
+
+METRICS_PATH = "assistant/custom/stats/metrics.json"
+
+_sources = collections.OrderedDict()
+
+
+def register(name, source):
+    """Register a callable returning statistics under name."""
+    _sources[name] = source
+
+
+def snapshot():
+    """Return statistics of every registered component."""
+    return {name: source() for name, source in list(_sources.items())}
+
+
+def dump(path=METRICS_PATH):
+    """Write a snapshot to a JSON file atomically."""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "w") as file:
+            json.dump(snapshot(), file, indent=2)
+        os.replace(path + ".tmp", path)
+    except OSError:
+        pass
+
+
+class Histogram(object):
+    """Thread-safe latency histogram with fixed millisecond buckets."""
+
+    bounds = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        milliseconds = seconds * 1000
+        with self._lock:
+            self.counts[bisect.bisect_left(self.bounds, milliseconds)] += 1
+            self.count += 1
+            self.total += milliseconds
+            self.max = max(self.max, milliseconds)
+
+    def percentile(self, p):
+        """Upper bound in ms of the bucket holding the p-th percentile."""
+        if not self.count:
+            return None
+        rank = p * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def info(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count if self.count else None,
+            "max_ms": self.max,
+            "p50_ms": self.percentile(0.5),
+            "p99_ms": self.percentile(0.99),
+            "buckets_ms": {
+                f"<={bound}": count
+                for bound, count in zip(self.bounds, self.counts)
+                if count
+            },
+            "slower": self.counts[-1],
+        }
@@ -19,36 +19,57 @@ COLORS = {
 }
 
 
-def chatbot_only(func):
-    def wrapper(text, interface, assistant):
-        if type(interface).__name__ == "TelegramBot":
-            func(text, interface, assistant)
+# interface kind and device role every capability decorator limits a
+# skill function to, None for any. Skill grammars of other interfaces
+# and devices leave such functions' intents out.
+CAPABILITIES = {
+    "chatbot_only": ("chatbot", None),
+    "voice_only": ("voice", None),
+    "server_only": (None, "server"),
+    "pc_only": (None, "pc"),
+}
+
 
-    return wrapper
+def capability(name, allowed):
+    def decorator(func):
+        def wrapper(text, interface, assistant):
+            if allowed(interface, assistant):
+                return func(text, interface, assistant)
 
+        wrapper.capabilities = getattr(func, "capabilities", ()) + (name,)
+        return wrapper
 
-def voice_only(func):
-    def wrapper(text, interface, assistant):
-        if type(interface).__name__ == "VoiceInterface":
-            func(text, interface, assistant)
+    return decorator
 
-    return wrapper
 
+chatbot_only = capability(
+    "chatbot_only",
+    lambda interface, assistant: getattr(interface, "kind", None) == "chatbot",
+)
 
-def server_only(func):
-    def wrapper(text, interface, assistant):
-        if assistant.on_server:
-            func(text, interface, assistant)
+voice_only = capability(
+    "voice_only",
+    lambda interface, assistant: getattr(interface, "kind", None) == "voice",
+)
 
-    return wrapper
+server_only = capability(
+    "server_only", lambda interface, assistant: assistant.on_server
+)
 
+pc_only = capability(
+    "pc_only", lambda interface, assistant: not assistant.on_server
+)
 
-def pc_only(func):
-    def wrapper(text, interface, assistant):
-        if not assistant.on_server:
-            func(text, interface, assistant)
 
-    return wrapper
+def scope_allows(capabilities, scope):
+    """Whether functions with capabilities can run in scope, a tuple of
+    interface kind and device role where None stands for any.
+    """
+    for name in capabilities:
+        for required, actual in zip(CAPABILITIES[name], scope):
+            if required and actual and required != actual:
+                return False
+    return True
 
 
 def pick_phrase(phrases, me=""):
@@ -0,0 +1,20 @@
+"""The assistant keeps runtime caches under assistant/custom/cache
+relative to the working directory, tests run in a temporary one so that
+nothing is written into the source tree.
+"""
+
+import os
+import shutil
+import tempfile
+
+_previous = os.getcwd()
+_directory = tempfile.mkdtemp(prefix="assistant-tests-")
+
+
+def pytest_configure(config):
+    os.chdir(_directory)
+
+
+def pytest_unconfigure(config):
+    os.chdir(_previous)
+    shutil.rmtree(_directory, ignore_errors=True)
@@ -0,0 +1,126 @@
+import os
+import wave
+import threading
+
+import pytest
+
+from assistant.modules import audio
+from assistant.modules.audio import AudioEngine
+
+
+class Stream(object):
+    """Output stream recording what is written."""
+
+    def __init__(self, gate=None):
+        self.written = []
+        self.gate = gate
+
+    def write(self, data):
+        if self.gate is not None:
+            self.gate.wait(2)
+        self.written.append(data)
+
+    def stop_stream(self):
+        pass
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = AudioEngine()
+    engine.stream = Stream()
+    monkeypatch.setattr(engine, "_open", lambda: engine.stream)
+    return engine
+
+
+def test_bytes_and_chunks_are_played(engine):
+    engine.play(b"\1\0" * audio.WRITE_BYTES, wait=True)
+    assert len(engine.stream.written) == 2
+    assert b"".join(engine.stream.written) == b"\1\0" * audio.WRITE_BYTES
+
+    # chunks split within a sample are joined again
+    engine.stream.written.clear()
+    engine.play(iter([b"\1", b"\0\2", b"\0"]), wait=True)
+    assert engine.stream.written == [b"\1\0", b"\2\0"]
+    assert engine.info()["played"] == 2
+
+
+def test_errors_are_raised_to_the_caller(engine):
+    def chunks():
+        yield b"\0\0"
+        raise OSError("polly is down")
+
+    with pytest.raises(OSError, match="polly is down"):
+        engine.play(chunks(), wait=True)
+    # the engine keeps playing
+    engine.play(b"\0\0", wait=True)
+    assert engine.stream.written == [b"\0\0", b"\0\0"]
+
+
+def test_priorities_and_interrupt(engine):
+    gate = threading.Event()
+    engine.stream.gate = gate
+    first = engine.play(b"\1\0")
+    for _ in range(100):
+        if engine._current is first:
+            break
+        threading.Event().wait(0.01)
+
+    ding = engine.play(b"\3\0", audio.DING)
+    engine.play(b"\2\0", audio.SPEECH)
+    engine.play(b"\0\0", audio.ACKNOWLEDGEMENT)
+    gate.set()
+    ding.wait(2)
+    assert engine.stream.written == [b"\1\0", b"\0\0", b"\2\0", b"\3\0"]
+
+    # queued clips are dropped, the playing one is stopped
+    gate.clear()
+    engine.stream.written.clear()
+    playing = engine.play(b"\1\0" * audio.WRITE_BYTES * 4)
+    queued = engine.play(b"\2\0")
+    for _ in range(100):
+        if engine._current is playing:
+            break
+        threading.Event().wait(0.01)
+    engine.interrupt()
+    assert queued.wait(1)
+    gate.set()
+    assert playing.wait(2)
+    assert len(engine.stream.written) == 1
+    assert playing.error is None and engine.info()["interrupted"] == 1
+
+
+def write_wav(path, frames, rate=audio.RATE, channels=1):
+    with wave.open(str(path), "wb") as file:
+        file.setsampwidth(2)
+        file.setnchannels(channels)
+        file.setframerate(rate)
+        file.writeframes(b"\1\0" * frames * channels)
+
+
+def test_clip_bank(tmp_path):
+    # converts other formats
+    pytest.importorskip("miniaudio")
+    write_wav(tmp_path / "hi.wav", 1600)
+    # decoded to the engine's rate and channels
+    write_wav(tmp_path / "yes.wav", 800, rate=8000, channels=2)
+    (tmp_path / "notes.txt").write_text("not a sound")
+
+    bank = audio.ClipBank(str(tmp_path))
+    assert sorted(bank.clips) == ["hi.wav", "yes.wav"]
+    assert len(bank.clips["hi.wav"]) == 3200
+    assert abs(len(bank.clips["yes.wav"]) - 3200) <= 4
+    assert bank.choice() in bank.clips.values()
+
+    # clips past the memory cap are skipped
+    small = audio.ClipBank(str(tmp_path), max_bytes=4000)
+    assert list(small.clips) == ["hi.wav"]
+    assert small.info()["skipped"] == 1
+
+    os.remove(tmp_path / "yes.wav")
+    assert bank.stamps() != bank._stamps
+    bank.load()
+    assert list(bank.clips) == ["hi.wav"] and bank.info()["loads"] == 2
+
+    empty = tmp_path / "empty"
+    os.mkdir(empty)
+    assert audio.ClipBank(str(empty)).choice() is None
@@ -0,0 +1,129 @@
+import threading
+
+import pytest
+
+from assistant.utils import cache
+from assistant.utils.cache import LRUCache, memoize
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+
+def test_lru_cache():
+    lru = LRUCache(maxsize=2)
+    lru.put("a", 1)
+    lru.put("b", 2)
+    assert lru.get("a") == 1
+    lru.put("c", 3)
+    assert "b" not in lru and lru.get("a") == 1 and lru.get("c") == 3
+    assert lru.get("b") is None
+    assert lru.info() == {"hits": 3, "misses": 1, "size": 2, "maxsize": 2}
+
+
+def test_disabled():
+    lru = LRUCache(maxsize=0)
+    lru.put("a", 1)
+    assert lru.get("a") is None and len(lru) == 0
+
+
+def test_ttl(clock):
+    calls = []
+
+    @memoize(ttl=10, name="test.ttl")
+    def fetch(x):
+        calls.append(x)
+        return len(calls)
+
+    assert fetch(1) == 1
+    assert fetch(1) == 1
+    assert fetch(2) == 2
+    clock.now = 11
+    assert fetch(1) == 3
+    assert fetch.info()["hits"] == 1
+    assert fetch.info()["misses"] == 3
+
+
+def test_errors_are_not_cached(clock):
+    calls = []
+
+    @memoize(ttl=10, name="test.errors")
+    def fetch():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ValueError
+        return len(calls)
+
+    with pytest.raises(ValueError):
+        fetch()
+    assert fetch() == 2
+    assert fetch.info()["errors"] == 1
+
+
+def test_stale_refreshes_once_in_background(clock):
+    refreshing = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    @memoize(ttl=10, stale=100, name="test.stale")
+    def fetch():
+        calls.append(1)
+        if len(calls) > 1:
+            refreshing.set()
+            release.wait(2)
+        return len(calls)
+
+    assert fetch() == 1
+    clock.now = 50
+    # expired but within stale: old value, one refresh however often
+    assert [fetch() for _ in range(5)] == [1] * 5
+    assert refreshing.wait(2)
+    assert len(calls) == 2
+    release.set()
+    for _ in range(100):
+        if fetch() == 2:
+            break
+        threading.Event().wait(0.01)
+    assert fetch() == 2
+    assert fetch.info()["stale_hits"] >= 5
+
+    # past stale the call waits for a fresh value
+    clock.now = 500
+    assert fetch() == 3
+
+
+def test_concurrent_calls_coalesce(clock):
+    release = threading.Event()
+    calls = []
+
+    @memoize(ttl=10, name="test.coalesce")
+    def fetch():
+        calls.append(1)
+        release.wait(2)
+        return "value"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(fetch()))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    threading.Event().wait(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(2)
+    assert results == ["value"] * 4
+    assert len(calls) == 1
+    assert fetch.info()["coalesced"] == 3
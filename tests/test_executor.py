@@ -0,0 +1,135 @@
+import time
+import threading
+import concurrent.futures
+
+import pytest
+
+from assistant.skills._executor import SkillExecutor, cancelled
+
+
+class Interface(object):
+    def __init__(self):
+        self.outputs = []
+        self.said = threading.Event()
+
+    def output(self, text):
+        self.outputs.append(text)
+        self.said.set()
+
+
+@pytest.fixture
+def executor():
+    executor = SkillExecutor(max_workers=4, timeout=0, concurrency=1)
+    yield executor
+    executor.shutdown(wait=False)
+
+
+def test_result_and_errors(executor):
+    interface = Interface()
+    task = executor.submit("s", lambda: 42, (), interface)
+    assert task.future.result(1) == 42
+
+    task = executor.submit("s", lambda: 1 / 0, (), interface)
+    with pytest.raises(ZeroDivisionError):
+        task.future.result(1)
+    assert executor.info()["errors"] == 1
+    # reported after the future is done
+    assert interface.said.wait(1)
+    assert interface.outputs == ["Error occured."]
+
+
+def test_timeout_keeps_the_slot(executor):
+    executor.configure("slow", timeout=0.1)
+    interface = Interface()
+    release = threading.Event()
+    stopped = []
+
+    def hang():
+        release.wait(2)
+        stopped.append(cancelled())
+
+    first = executor.submit("slow", hang, (), interface)
+    with pytest.raises(concurrent.futures.TimeoutError):
+        first.future.result(1)
+    assert interface.said.wait(1)
+    assert interface.outputs == ["Sorry, that takes too long."]
+
+    # the hanging call still occupies the only slot, the next one waits
+    # in the queue and times out there
+    second = executor.submit("slow", lambda: 1, (), None)
+    assert executor.info()["queued"] == 1
+    with pytest.raises(concurrent.futures.TimeoutError):
+        second.future.result(1)
+    assert executor.info() == dict(
+        executor.info(), running=1, queued=0, timeouts=2
+    )
+
+    release.set()
+    time.sleep(0.1)
+    assert stopped == [True]
+    assert executor.info()["running"] == 0
+    assert executor.submit("slow", lambda: 2, (), None).future.result(1) == 2
+
+
+def test_concurrency_cap(executor):
+    executor.configure("capped", concurrency=2)
+    lock = threading.Lock()
+    running, peak = [0], [0]
+
+    def work():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+
+    tasks = [executor.submit("capped", work, (), None) for _ in range(8)]
+    for task in tasks:
+        task.future.result(2)
+    assert peak[0] == 2
+
+
+def test_cancel_queued(executor):
+    release = threading.Event()
+    running = executor.submit("s", release.wait, (2,), None)
+    queued = executor.submit("s", lambda: 1, (), None)
+    executor.cancel(queued)
+    release.set()
+    assert running.future.result(1) is True
+    with pytest.raises(concurrent.futures.CancelledError):
+        queued.future.result(1)
+    assert executor.info()["cancellations"] == 1
+
+
+def test_one_watchdog_for_every_deadline(executor):
+    executor.configure("slow", timeout=0.5, concurrency=10)
+    executor.configure("fast", timeout=0.05)
+    release = threading.Event()
+    threads = threading.active_count()
+    slow = [
+        executor.submit("slow", release.wait, (2,), None) for _ in range(3)
+    ]
+    # an earlier deadline than the one the watchdog waits for
+    fast = executor.submit("fast", release.wait, (2,), None)
+    with pytest.raises(concurrent.futures.TimeoutError):
+        fast.future.result(0.3)
+    assert not any(task.future.done() for task in slow)
+    # workers and a single watchdog, no thread per deadline
+    assert threading.active_count() <= threads + 4 + 1
+    release.set()
+    assert all(task.future.result(1) for task in slow)
+
+
+def test_finished_once_the_call_returns(executor):
+    executor.configure("slow", timeout=0.05)
+    release = threading.Event()
+    running = executor.submit("slow", release.wait, (2,), None)
+    queued = executor.submit("slow", lambda: 1, (), None)
+    with pytest.raises(concurrent.futures.TimeoutError):
+        running.future.result(1)
+    # dropped from the queue, while the call that timed out still runs
+    assert queued.finished.wait(1)
+    assert not running.finished.is_set()
+    release.set()
+    assert running.finished.wait(1)
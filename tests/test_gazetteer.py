@@ -0,0 +1,38 @@
+import re
+import random
+
+from assistant.nlp.gazetteer import Gazetteer
+
+
+def alternation(entities, text):
+    """Custom entities as found with a regex alternation per key."""
+    found = {}
+    for key, values in entities.items():
+        values = [re.escape(value) for value in values if value]
+        match = values and re.search("|".join(values), text)
+        if match:
+            found[key] = match.group()
+    return found
+
+
+def test_same_as_alternation():
+    rng = random.Random(1)
+    alphabet = "ab c."
+    for _ in range(3000):
+        entities = {
+            f"k{i}": [
+                "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4)))
+                for _ in range(rng.randint(1, 4))
+            ]
+            for i in range(rng.randint(1, 4))
+        }
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 20)))
+        expected = alternation(entities, text)
+        found = Gazetteer(entities).find(text)
+        assert found == expected and list(found) == list(expected)
+
+
+def test_listed_order_wins_at_the_same_position():
+    gazetteer = Gazetteer({"room": ["living", "living room"]})
+    assert gazetteer.find("lights in the living room") == {"room": "living"}
+    assert Gazetteer({}).find("anything") == {}
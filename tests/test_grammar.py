@@ -0,0 +1,98 @@
+import pickle
+
+from assistant.nlp import grammar
+
+
+def manifest(**hashes):
+    return {
+        name: {"hash": digest, "regex": {name: [f"{name} <<what>>"]}}
+        for name, digest in hashes.items()
+    }
+
+
+def load(path, skills):
+    return grammar.load_grammar(
+        str(path), manifest=skills, entities={}, capabilities={}
+    )
+
+
+def counting(monkeypatch):
+    processed = []
+    prepare = grammar.prepare_regex_expressions
+
+    def counted(expressions):
+        processed.extend(expressions)
+        return prepare(expressions)
+
+    monkeypatch.setattr(grammar, "prepare_regex_expressions", counted)
+    return processed
+
+
+def test_only_changed_skills_are_processed(tmp_path, monkeypatch):
+    path = tmp_path / "grammar.pickle"
+    processed = counting(monkeypatch)
+    first = load(path, manifest(play="a", stop="b"))
+    assert sorted(processed) == ["play", "stop"]
+    assert first.matcher.match("play jazz").intent == "play"
+
+    processed.clear()
+    cached = load(path, manifest(play="a", stop="b"))
+    assert processed == []
+    assert cached.key == first.key
+    assert cached.matcher.match("stop it").intent == "stop"
+
+    cached = load(path, manifest(play="a", stop="c"))
+    assert processed == ["stop"]
+    assert cached.key != first.key
+
+
+def test_rebuilt_when_nlp_sources_change(tmp_path, monkeypatch):
+    path = tmp_path / "grammar.pickle"
+    load(path, manifest(play="a"))
+    with open(path, "rb") as file:
+        assert pickle.load(file)["version"] == grammar.source_hash()
+
+    # e.g. the matcher changed since the cache was written
+    monkeypatch.setattr(grammar, "VERSION", "other")
+    processed = counting(monkeypatch)
+    assert load(path, manifest(play="a")).matcher.match("play x")
+    assert processed == ["play"]
+
+
+def test_broken_cache_is_ignored(tmp_path):
+    path = tmp_path / "grammar.pickle"
+    path.write_bytes(b"not a pickle")
+    assert load(path, manifest(play="a")).matcher.match("play x")
+
+
+def test_scoped_grammars(tmp_path):
+    path = tmp_path / "grammar.pickle"
+    skills = manifest(chat="a", say="b", play="c")
+    capabilities = {
+        "chat": ["chatbot_only"], "say": ["voice_only", "pc_only"],
+    }
+    full = grammar.load_grammar(
+        str(path), manifest=skills, entities={}, capabilities=capabilities
+    )
+    assert full.matcher.match("chat hi").intent == "chat"
+
+    voice = grammar.scoped_grammar(full, ("voice", "pc"))
+    assert list(voice.expressions) == ["say", "play"]
+    assert voice.matcher.match("chat hi") is None
+    assert grammar.scoped_grammar(full, ("voice", "pc")) is voice
+
+    server = grammar.scoped_grammar(full, ("voice", "server"))
+    assert list(server.expressions) == ["play"]
+    assert grammar.scoped_grammar(full, None) is full
+
+    # every scope is built ahead and cached with the full grammar
+    cached = grammar.load_grammar(
+        str(path), manifest=skills, entities={}, capabilities=capabilities
+    )
+    assert set(cached.scoped) == set(grammar.SCOPES)
+    chatbot = grammar.scoped_grammar(cached, ("chatbot", "pc"))
+    assert list(chatbot.expressions) == ["chat", "play"]
+
+    # other capabilities are not cached
+    everything = grammar.scoped_grammar(full, ("voice", "server"), {})
+    assert everything is full
@@ -0,0 +1,57 @@
+import re
+import random
+
+from assistant.nlp.literals import LiteralIndex, literal_tokens, surface_forms
+from assistant.nlp.matcher import slot_regex
+
+
+def test_literal_tokens():
+    assert literal_tokens("(?:new|add) skill") == {("prefix", "skill")}
+    assert literal_tokens("volume up <level>") == {
+        ("suffix", "volume"), ("word", "up"),
+    }
+    # optional characters cut the run, "skill" alone may be part of
+    # any word
+    assert literal_tokens("skills? now") == {("prefix", "now")}
+    # top level alternations and flags require nothing
+    assert literal_tokens("stop|pause") == frozenset()
+    assert literal_tokens("(?i)stop") == frozenset()
+
+
+def test_candidates_never_miss_a_match():
+    rng = random.Random(5)
+    atoms = [
+        "a", "b", " ", "ab", "(?:a|b)", "(?: a)?", "b?", "a*",
+        " <x>", " <<y>>", "[ab]", ".", "a+", "\\s",
+    ]
+    checked = 0
+    for _ in range(3000):
+        value = "".join(rng.choice(atoms) for _ in range(rng.randint(1, 6)))
+        try:
+            pattern = re.compile(slot_regex(value))
+        except re.error:
+            continue
+        index = LiteralIndex([literal_tokens(value)])
+        for _ in range(10):
+            text = "".join(rng.choice("ab  ") for _ in range(rng.randint(0, 10)))
+            if pattern.search(text):
+                checked += 1
+                assert index.candidates(text) == [0], (value, text)
+    assert checked
+
+
+def test_candidates_are_sorted_and_filtered():
+    index = LiteralIndex([
+        literal_tokens("turn on <thing>"),
+        literal_tokens("play <<song>>"),
+        literal_tokens("<<anything>>"),
+        literal_tokens("turn off <thing>"),
+    ])
+    assert index.candidates("turn on lamp") == [0, 2]
+    assert index.candidates("please play it") == [1, 2]
+
+
+def test_surface_forms():
+    assert surface_forms("(?:new|add) skill") == ["add skill", "new skill"]
+    assert surface_forms("next(?: song)?") == ["next", "next song"]
+    assert surface_forms("skip .*") is None
@@ -0,0 +1,92 @@
+import os
+import json
+
+from assistant.skills._manifest import (
+    load_manifest,
+    list_skills,
+    skill_hash,
+)
+
+SKILL = '''
+from assistant.utils import chatbot_only
+
+regex = {"greet": ["hello <<name>>"], "greet.back": ["hi again"]}
+entities = {"name": ["bob", "alice"]}
+timeout = 5
+process = True
+
+
+def prepare_greet(text_struct, assistant):
+    pass
+
+
+@chatbot_only
+def greet(text_struct, interface, assistant):
+    pass
+'''
+
+
+def write(path, source):
+    with open(path, "w") as file:
+        file.write(source)
+
+
+def test_literals_are_read_without_import(tmp_path):
+    write(tmp_path / "greeting.py", SKILL)
+    os.mkdir(tmp_path / "_private")
+    assert list_skills(tmp_path) == ["greeting"]
+
+    cache = str(tmp_path / "cache" / "skills.json")
+    manifest = load_manifest("nowhere", tmp_path, ["greeting"], cache)
+    entry = manifest["greeting"]
+    assert entry["regex"] == {
+        "greet": ["hello <<name>>"], "greet.back": ["hi again"],
+    }
+    assert entry["entities"] == {"name": ["bob", "alice"]}
+    assert entry["timeout"] == 5
+    assert entry["concurrency"] is None
+    assert entry["process"] is True
+    assert entry["prepare"] == ["prepare_greet"]
+    assert entry["capabilities"] == {"greet": ["chatbot_only"]}
+    assert entry["hash"] == skill_hash(tmp_path, "greeting")
+
+
+def test_entries_reused_until_source_changes(tmp_path):
+    write(tmp_path / "greeting.py", SKILL)
+    cache = str(tmp_path / "skills.json")
+    load_manifest("nowhere", tmp_path, ["greeting"], cache)
+
+    # a cached entry is trusted as long as the hash matches
+    with open(cache) as file:
+        stored = json.load(file)
+    stored["skills"]["greeting"]["timeout"] = 7
+    with open(cache, "w") as file:
+        json.dump(stored, file)
+    manifest = load_manifest("nowhere", tmp_path, ["greeting"], cache)
+    assert manifest["greeting"]["timeout"] == 7
+
+    write(tmp_path / "greeting.py", SKILL.replace("timeout = 5", "timeout = 9"))
+    manifest = load_manifest("nowhere", tmp_path, ["greeting"], cache)
+    assert manifest["greeting"]["timeout"] == 9
+
+
+def test_package_reads_what_its_init_imports(tmp_path):
+    package = tmp_path / "greeting"
+    os.mkdir(package)
+    write(package / "__init__.py", (
+        "from .main import *\n"
+        "from .settings import limit as concurrency\n"
+    ))
+    write(package / "main.py", SKILL.replace("timeout = 5", "from .helpers import connect"))
+    write(package / "settings.py", "limit = 3\ntimeout = 30\n")
+    # not imported by the package, its settings are not the skill's
+    write(package / "helpers.py", "timeout = 10\nprocess = False\n")
+
+    cache = str(tmp_path / "skills.json")
+    entry = load_manifest("nowhere", tmp_path, ["greeting"], cache)["greeting"]
+    assert entry["regex"]["greet"] == ["hello <<name>>"]
+    assert entry["timeout"] is None
+    assert entry["concurrency"] == 3
+    assert entry["process"] is True
+    assert entry["prepare"] == ["prepare_greet"]
+    assert entry["capabilities"] == {"greet": ["chatbot_only"]}
@@ -0,0 +1,136 @@
+import re
+import pickle
+import random
+import collections
+
+from assistant.nlp.grammar import prepare_regex_expressions
+from assistant.nlp.matcher import IntentMatcher, slot_regex
+
+words = ["play", "music", "turn", "on", "off", "light", "up", "the", "next"]
+
+
+def random_expression(rng):
+    parts, slots = [], 0
+    for _ in range(rng.randint(1, 4)):
+        r = rng.random()
+        if r < 0.7:
+            parts.append(rng.choice(words))
+        else:
+            parts.append(f"<x{slots}>" if r < 0.85 else f"<<y{slots}>>")
+            slots += 1
+    return " ".join(parts)
+
+
+def naive(matcher, text):
+    """Index of the first expression matching text, in priority order."""
+    for index, (_, expr) in enumerate(matcher.entries):
+        if re.search(slot_regex(expr["value"]), text):
+            return index
+
+
+def scan_texts(matcher, rng, calls=2000):
+    """Match random texts, a few of them often, against a plain scan."""
+    texts = [
+        " ".join(rng.choice(words) for _ in range(rng.randint(1, 6)))
+        for _ in range(200)
+    ]
+    for _ in range(calls):
+        text = rng.choice(texts[:10] if rng.random() < 0.7 else texts)
+        match = matcher.match(text)
+        expected = naive(matcher, text)
+        if expected is None:
+            assert match is None
+        else:
+            assert match.expression is matcher.entries[expected][1]
+
+
+def random_matcher(rng, n_intents):
+    expressions = collections.OrderedDict(
+        (f"i{k}", [random_expression(rng) for _ in range(rng.randint(1, 3))])
+        for k in range(n_intents)
+    )
+    return IntentMatcher(prepare_regex_expressions(expressions))
+
+
+def test_same_as_priority_scan():
+    rng = random.Random(1)
+    for n_intents in (10, 60, 300):
+        matcher = random_matcher(rng, n_intents)
+        scan_texts(matcher, rng)
+
+
+def test_hot_expressions_keep_priority():
+    rng = random.Random(2)
+    for n_intents in (60, 300):
+        matcher = random_matcher(rng, n_intents)
+        # learn hot expressions quickly
+        matcher.reorder_every = 40
+        matcher.sample_every = 3
+        scan_texts(matcher, rng)
+        assert matcher.hot
+
+    # candidates above a hot expression checked with combined patterns
+    matcher = random_matcher(rng, 300)
+    matcher.reorder_every, matcher.sample_every = 40, 3
+    matcher.scan_limit, matcher.leaf_size = 1, 4
+    scan_texts(matcher, rng)
+    assert matcher.hot and matcher._overlaps
+
+
+def test_entities_and_end():
+    expressions = prepare_regex_expressions(
+        {"weather": ["weather in <city> on <<day>>"]}
+    )
+    match = IntentMatcher(expressions).match("weather in paris on friday")
+    assert match.intent == "weather"
+    assert match.entities == {"city": "paris", "day": "friday"}
+    assert match.end == len("weather in paris on friday")
+
+
+def test_phrases_keep_priority():
+    expressions = prepare_regex_expressions(collections.OrderedDict([
+        ("music", ["(?:pause|stop) <<what>>"]),
+        ("pause", ["pause", "(?:volume|sound) (?:up|down)"]),
+        ("next", ["next(?: song)?"]),
+    ]))
+    matcher = IntentMatcher(expressions)
+    assert "sound down" in matcher.phrases
+    # building the table counts no hits
+    assert not any(row[0] for row in matcher.usage.values())
+    assert matcher.match("pause").intent == "pause"
+    assert matcher.match("next song").intent == "next"
+    # matched by the higher priority expression with a slot
+    assert matcher.match("stop music").intent == "music"
+
+
+def test_phrases_won_by_slots_are_not_stored():
+    expressions = prepare_regex_expressions(collections.OrderedDict([
+        ("song", ["play <<song>> now"]),
+        ("music", ["play music now"]),
+    ]))
+    matcher = IntentMatcher(expressions)
+    assert "play music now" not in matcher.phrases
+    match = matcher.match("play music now")
+    assert match.intent == "song"
+    assert match.entities == {"song": "music"}
+    assert match.end == len("play music")
+
+
+def test_phrase_keys_are_normalized():
+    expressions = prepare_regex_expressions({"add": ["(?:new|add) skill"]})
+    matcher = IntentMatcher(expressions)
+    match = matcher.match("  Add   skill ")
+    assert match.intent == "add"
+    # end is a position in the text as given
+    assert match.end == len("  Add   skill")
+    assert matcher.usage["(?:new|add) skill"][0] == 1
+
+
+def test_pickle():
+    expressions = prepare_regex_expressions(
+        {"a": ["turn on <thing>"], "b": ["turn <<rest>>", "lights off"]}
+    )
+    matcher = pickle.loads(pickle.dumps(IntentMatcher(expressions)))
+    assert matcher.match("turn on lamp").entities == {"thing": "lamp"}
+    assert matcher.match("turn around").intent == "b"
+    assert matcher.match("lights off").intent == "b"
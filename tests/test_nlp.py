@@ -0,0 +1,37 @@
+from assistant.nlp.nlp import NaturalLanguageProcessor
+from assistant.nlp.nlu import (
+    NaturalLanguageUnderstander,
+    prepare_regex_expressions,
+)
+
+expressions = prepare_regex_expressions(
+    {"light": ["turn on <thing>"], "music": ["play <<song>>"]}
+)
+
+
+def processor():
+    nlp = NaturalLanguageProcessor()
+    nlp.nlu = NaturalLanguageUnderstander(
+        expressions=expressions, custom_entities={}
+    )
+    return nlp
+
+
+def test_split_and_completed():
+    nlp = processor()
+    structs = list(nlp.structs("turn on lamp and play jazz"))
+    assert [s.intent for s in structs] == ["light", "music"]
+    nlp.completed.add(structs[0])
+    # the completed text leaves an empty segment
+    structs = list(nlp.structs("turn on lamp and play jazz"))
+    assert [s.intent for s in structs] == [None, "music"]
+
+
+def test_interim_transcripts_reuse_earlier_segments():
+    nlp = processor()
+    for text in (
+        "turn on lamp", "turn on lamp and play", "turn on lamp and play jazz"
+    ):
+        list(nlp.structs(text))
+    # "turn on lamp" was understood once
+    assert nlp.nlu.cache.info()["hits"] == 2
@@ -0,0 +1,30 @@
+from assistant.nlp.nlu import (
+    NaturalLanguageUnderstander,
+    prepare_regex_expressions,
+)
+
+expressions = prepare_regex_expressions(
+    {"weather": ["weather in <city>"], "music": ["play <<song>>"]}
+)
+
+
+def test_results_are_cached_by_lowercased_text():
+    nlu = NaturalLanguageUnderstander(
+        expressions=expressions, custom_entities={}
+    )
+    first = nlu.understand("Weather in Paris")
+    assert (first.intent, first.entities) == ("weather", {"city": "paris"})
+    # callers may modify what they get
+    first.entities["city"] = "rome"
+    second = nlu.understand("weather in paris")
+    assert second.entities == {"city": "paris"}
+    assert nlu.cache.info()["hits"] == 1
+
+
+def test_cache_can_be_disabled():
+    nlu = NaturalLanguageUnderstander(
+        expressions=expressions, custom_entities={}, cache_size=0
+    )
+    assert nlu.understand("play jazz").entities == {"song": "jazz"}
+    assert nlu.understand("play jazz").entities == {"song": "jazz"}
+    assert nlu.cache.info()["hits"] == 0
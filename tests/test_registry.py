@@ -0,0 +1,115 @@
+import types
+import concurrent.futures
+
+from assistant.skills._registry import SkillRegistry
+
+
+def skill_module(name, calls):
+    """A loaded skill whose functions record their calls."""
+    def play(text_struct, interface, assistant):
+        calls.append((name, text_struct.intent, text_struct.prepared))
+        return name
+
+    def stop(text_struct, interface, assistant):
+        raise RuntimeError("stop")
+
+    return types.SimpleNamespace(play=play, stop=stop)
+
+
+def loader(calls, loaded):
+    def load(name):
+        loaded.append(name)
+        return skill_module(name, calls)
+    return load
+
+
+def struct(intent):
+    return types.SimpleNamespace(intent=intent, prepared=None)
+
+
+def test_skills_load_on_first_dispatch():
+    calls, loaded = [], []
+    registry = SkillRegistry(loader(calls, loaded))
+    registry.update(
+        add=[("play", "music", False), ("play.next", "music", True)]
+    )
+    assert loaded == []
+    assert "play" in registry and "play.next" not in registry
+    assert registry.skill("play") == "music"
+    assert registry.prepares("play")
+
+    assert registry.dispatch(struct("play"), None, None) == "music"
+    assert registry.dispatch(struct("play"), None, None) == "music"
+    assert loaded == ["music"]
+    assert registry.stats()["play"]["skill"] == "music"
+    assert registry.stats()["play"]["errors"] == 0
+
+
+def test_errors_are_counted():
+    registry = SkillRegistry(loader([], []))
+    registry.add("stop", "music")
+    try:
+        registry.dispatch(struct("stop"), None, None)
+    except RuntimeError:
+        pass
+    assert registry.stats()["stop"]["errors"] == 1
+
+
+def test_update_keeps_handlers_of_untouched_skills():
+    calls, loaded = [], []
+    registry = SkillRegistry(loader(calls, loaded))
+    registry.update(add=[("play", "music", False), ("stop", "radio", False)])
+    registry.dispatch(struct("play"), None, None)
+    handler = registry.handler("stop")
+    assert loaded == ["music", "radio"]
+
+    # reloading radio keeps the resolved handler of music only
+    registry.update(remove=["radio"], add=[("stop", "radio", False)])
+    assert registry.handler("stop") is not handler
+    registry.handler("play")
+    assert loaded == ["music", "radio", "radio"]
+
+    # an intent taken over by another skill keeps its statistics
+    registry.add("play", "radio")
+    assert registry.dispatch(struct("play"), None, None) == "radio"
+    assert registry.stats()["play"]["skill"] == "radio"
+    assert registry.stats()["play"]["count"] == 2
+
+    registry.remove("radio")
+    assert "play" not in registry and "stop" not in registry
+    assert "play" in registry.stats()
+
+
+def test_routed_skills_use_the_pool():
+    class Pool(object):
+        def handler(self, skill, intent):
+            return lambda *args: f"{skill}.{intent} in a worker"
+
+    registry = SkillRegistry(loader([], []))
+    registry.add("play", "music")
+    assert registry.dispatch(struct("play"), None, None) == "music"
+    registry.route("music", Pool())
+    assert registry.dispatch(struct("play"), None, None) == (
+        "music.play in a worker"
+    )
+    registry.route("music")
+    assert registry.dispatch(struct("play"), None, None) == "music"
+
+
+def test_dispatch_waits_for_prepared():
+    calls = []
+    registry = SkillRegistry(loader(calls, []))
+    registry.add("play", "music", prepares=True)
+
+    prepared = types.SimpleNamespace(
+        future=concurrent.futures.Future(), timeout=None
+    )
+    prepared.future.set_result("playlist")
+    registry.dispatch(struct("play"), None, None, prepared)
+
+    # a prepare that never finishes is waited for at most its timeout
+    slow = types.SimpleNamespace(
+        future=concurrent.futures.Future(), timeout=0.01
+    )
+    registry.dispatch(struct("play"), None, None, slow)
+    assert calls == [("music", "play", "playlist"), ("music", "play", None)]
@@ -0,0 +1,75 @@
+import os
+import sys
+
+import assistant.skills as skills
+from assistant.skills._manifest import load_manifest
+from assistant.skills._registry import SkillRegistry
+from assistant.skills._reload import stamps, unload
+
+SKILL = '''
+regex = {"echo": ["echo <<text>>"]}
+
+
+def echo(text_struct, interface, assistant):
+    return "%s"
+'''
+
+
+def write(path, source):
+    with open(path, "w") as file:
+        file.write(source)
+    # mtimes of quick successive writes may be equal
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10 ** 9))
+
+
+def test_stamps_and_unload(tmp_path):
+    write(tmp_path / "echo.py", SKILL % "first")
+    first = stamps(tmp_path)
+    assert list(first) == ["echo"]
+    write(tmp_path / "echo.py", SKILL % "second")
+    assert stamps(tmp_path) != first
+
+    sys.modules["nowhere.echo"] = sys.modules["nowhere.echo.part"] = os
+    sys.modules["nowhere.echoes"] = os
+    unload("nowhere", "echo")
+    assert "nowhere.echo" not in sys.modules
+    assert "nowhere.echo.part" not in sys.modules
+    assert sys.modules.pop("nowhere.echoes") is os
+
+
+def test_reload_swaps_changed_skills(tmp_path, monkeypatch):
+    write(tmp_path / "echo_test_skill.py", SKILL % "first")
+    names = ["echo_test_skill"]
+    registry = SkillRegistry(skills.load_skill)
+    monkeypatch.setattr(skills, "__path__", [str(tmp_path)])
+    monkeypatch.setattr(skills, "dir_path", str(tmp_path))
+    monkeypatch.setattr(skills, "registry", registry)
+    monkeypatch.setattr(skills, "_reload_builders", [])
+    monkeypatch.setattr(skills, "_reload_listeners", [])
+    monkeypatch.setattr(skills, "skill_names", names)
+    monkeypatch.setattr(
+        skills, "manifest", load_manifest(skills.__name__, tmp_path, names)
+    )
+    registry.update(add=skills.intents(names, skills.manifest))
+
+    built, reloaded = [], []
+
+    def build(names, manifest, entities, capabilities):
+        built.append(names)
+        # the resolved handler is kept until everything is built
+        assert registry.handler("echo")(None, None, None) == "first"
+        return lambda: None
+
+    skills.before_reload(build)
+    skills.on_reload(reloaded.append)
+    try:
+        assert skills.reload_skills() == []
+        assert registry.handler("echo")(None, None, None) == "first"
+        write(tmp_path / "echo_test_skill.py", SKILL % "second")
+        previous = skills.manifest
+        assert skills.reload_skills() == names
+        assert built == reloaded == [names]
+        assert registry.handler("echo")(None, None, None) == "second"
+        assert skills.manifest is not previous
+    finally:
+        unload(skills.__name__, "echo_test_skill")
@@ -0,0 +1,106 @@
+import threading
+
+import pytest
+
+from assistant.nlp.text_structure import TextStructure
+from assistant.skills._speculation import Speculator
+
+
+class Registry(object):
+    """Every intent prepares with prepare, called with the struct."""
+
+    def __init__(self, prepare):
+        self.prepare = prepare
+
+    def prepares(self, intent):
+        return True
+
+    def skill(self, intent):
+        return "music"
+
+    def preparer(self, intent):
+        return lambda text_struct, assistant: self.prepare(text_struct)
+
+
+def struct(song):
+    return TextStructure({
+        "text": f"play {song}",
+        "intent": "play",
+        "entities": {"song": song},
+        "complete_entities": set(),
+        "expression": None,
+        "end": None,
+    })
+
+
+@pytest.fixture
+def speculator():
+    calls = []
+    release = threading.Event()
+
+    def prepare(text_struct):
+        calls.append(text_struct.entities["song"])
+        release.wait(2)
+        return text_struct.entities["song"]
+
+    speculator = Speculator(Registry(prepare), None)
+    speculator.calls, speculator.release = calls, release
+    yield speculator
+    release.set()
+    speculator.executor.shutdown(wait=False)
+
+
+def test_stable_structure_is_prepared(speculator):
+    voice = object()
+    speculator.update(struct("jazz"), voice)
+    assert speculator.take(struct("jazz"), voice) is None
+
+    speculator.update(struct("jazz"), voice)
+    speculator.update(struct("jazz"), voice)
+    speculator.update(struct("jazz"), voice)
+    speculator.release.set()
+    task = speculator.take(struct("jazz"), voice)
+    assert task.future.result(1) == "jazz"
+    # one prepare however often the structure repeats
+    assert speculator.calls == ["jazz"]
+
+
+def test_only_the_starting_interface_takes_it(speculator):
+    voice, telegram = object(), object()
+    speculator.update(struct("jazz"), voice)
+    speculator.update(struct("jazz"), voice)
+    assert speculator.take(struct("rock"), telegram) is None
+    assert speculator.take(struct("jazz"), telegram) is None
+    assert speculator.take(struct("jazz"), voice) is not None
+
+    speculator.update(struct("jazz"), voice)
+    speculator.update(struct("jazz"), voice)
+    speculator.reset(telegram)
+    speculator.reset(voice)
+    assert speculator.take(struct("jazz"), voice) is None
+
+
+def test_running_prepare_is_left_to_finish(speculator):
+    voice = object()
+    speculator.update(struct("jazz"), voice)
+    speculator.update(struct("jazz"), voice)
+    for _ in range(100):
+        if speculator.calls:
+            break
+        threading.Event().wait(0.01)
+    jazz = speculator._tasks["play"][1]
+
+    # the outdated prepare is not stopped and no other one starts
+    # while it runs
+    speculator.update(struct("rock"), voice)
+    speculator.update(struct("rock"), voice)
+    assert not jazz.stopped.is_set()
+    assert speculator.take(struct("rock"), voice) is None
+    assert speculator.info()["dropped_running"] == 1
+
+    speculator.release.set()
+    assert jazz.finished.wait(1)
+    speculator.update(struct("rock"), voice)
+    speculator.update(struct("rock"), voice)
+    assert speculator.take(struct("rock"), voice).future.result(1) == "rock"
+    assert speculator.calls == ["jazz", "rock"]
@@ -0,0 +1,46 @@
+import os
+import importlib.util
+
+# loaded by path, the voice package needs boto3 and pyaudio
+_path = os.path.join(
+    os.path.dirname(__file__),
+    "..", "assistant", "interfaces", "voice", "speech_cache.py",
+)
+_spec = importlib.util.spec_from_file_location("speech_cache", _path)
+speech_cache = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(speech_cache)
+
+
+def test_memory_and_disk(tmp_path):
+    cache = speech_cache.SpeechCache(str(tmp_path))
+    assert cache.get("Brian", "mp3", "hello") is None
+    cache.put("Brian", "mp3", "hello", b"audio")
+    assert cache.get("Brian", "mp3", "hello") == b"audio"
+    # another voice or format is another clip
+    assert cache.get("Amy", "mp3", "hello") is None
+    assert cache.get("Brian", "pcm", "hello") is None
+
+    # a new cache finds the clip on disk
+    cache = speech_cache.SpeechCache(str(tmp_path))
+    assert cache.get("Brian", "mp3", "hello") == b"audio"
+    assert cache.get("Brian", "mp3", "hello") == b"audio"
+    info = cache.info()
+    assert (info["disk_hits"], info["memory_hits"]) == (1, 1)
+    key = speech_cache.speech_key("Brian", "mp3", "hello")
+    assert key.endswith(".mp3")
+    assert os.listdir(tmp_path) == [key]
+
+
+def test_bounded_in_bytes(tmp_path):
+    cache = speech_cache.SpeechCache(
+        str(tmp_path), memory_bytes=10, disk_bytes=20
+    )
+    for text in "abc":
+        cache.put("Brian", "mp3", text, b"x" * 8)
+    info = cache.info()
+    assert info["memory_clips"] == 1 and info["memory_bytes"] == 8
+    assert info["disk_clips"] == 2 and info["disk_bytes"] == 16
+    assert len(os.listdir(tmp_path)) == 2
+    # the least recently used clip was evicted
+    assert cache.get("Brian", "mp3", "a") is None
+    assert cache.get("Brian", "mp3", "b") == b"x" * 8
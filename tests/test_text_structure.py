@@ -0,0 +1,84 @@
+import re
+import itertools
+
+from assistant.nlp.nlu import (
+    NaturalLanguageUnderstander,
+    prepare_regex_expressions,
+)
+
+expressions = {
+    "light": ["turn on <thing>", "lights <<where>> please"],
+    "music.play": ["play <<song>>", "play <<song>> by <artist>"],
+    "music.stop": ["stop music"],
+    "note": ["note <<text>>"],
+    "timer": ["timer for <minutes> minutes"],
+}
+custom_entities = {"thing": ["lamp"]}
+
+
+def understander():
+    return NaturalLanguageUnderstander(
+        expressions=prepare_regex_expressions(expressions),
+        custom_entities=custom_entities,
+    )
+
+
+def was_complete(struct):
+    """is_complete as it was before the intent table."""
+    if not struct.intent:
+        return False
+    key = struct.intent
+    if struct.subintent:
+        key += "." + struct.subintent
+    similar = expressions[key]
+    if all("<" not in e for e in similar):
+        return True
+    required = set(re.findall(r"<{1,2}(.*?)>{1,2}", similar[0]))
+    if struct.complete_entities == required:
+        return True
+    if required.issubset(struct.entities):
+        if all("<<" not in e for e in similar):
+            return True
+        if "<<" not in re.findall(r"<{1,2}.*?>{1,2}", struct.expression)[-1]:
+            return True
+        if struct.end < len(struct.text) and struct.text[-1] != "a":
+            return True
+    return False
+
+
+def test_is_complete_as_before():
+    nlu = understander()
+    words = ["turn", "on", "lamp", "play", "jazz", "by", "stop", "music",
+             "note", "a", "timer", "for", "5", "minutes", "lights"]
+    checked = 0
+    for size in (1, 2, 3, 4):
+        for combination in itertools.product(words, repeat=size):
+            struct = nlu.understand(" ".join(combination))
+            assert struct.is_complete() == was_complete(struct), struct.text
+            checked += struct.intent is not None
+    assert checked
+
+
+def test_unknown_intent_is_not_complete():
+    struct = understander().understand("what is this")
+    assert struct.intent is None and not struct.is_complete()
+
+
+def test_equal_structures_hash_the_same():
+    nlu = understander()
+    first = nlu.understand("play jazz")
+    second = nlu.understand("PLAY JAZZ")
+    assert first == second and hash(first) == hash(second)
+    assert first != nlu.understand("play blues")
+    assert first != nlu.understand("stop music")
+    assert len({first, second, nlu.understand("stop music")}) == 2
+
+
+def test_copy_does_not_share_entities():
+    struct = understander().understand("turn on lamp")
+    copy = struct.copy()
+    copy.entities["thing"] = "fan"
+    copy.complete_entities.add("other")
+    assert struct.entities == {"thing": "lamp"}
+    assert struct.complete_entities == {"thing"}
+    assert not hasattr(struct, "__dict__")
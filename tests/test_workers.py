@@ -0,0 +1,105 @@
+import os
+import time
+import concurrent.futures
+
+import pytest
+
+from assistant.skills import _workers
+from assistant.skills._executor import SkillExecutor
+from assistant.skills._workers import WorkerPool, WorkerError
+
+SKILL = '''
+import os
+import time
+
+process = True
+
+
+def echo(text_struct, interface, assistant):
+    interface.output(f"{text_struct} from {assistant.name}")
+    return os.getpid()
+
+
+def fail(text_struct, interface, assistant):
+    raise ValueError(text_struct)
+
+
+def hang(text_struct, interface, assistant):
+    time.sleep(10)
+
+
+def prepare_echo(text_struct, assistant):
+    return text_struct.upper()
+'''
+
+
+class Interface(object):
+    def __init__(self):
+        self.outputs = []
+
+    def output(self, text):
+        self.outputs.append(text)
+
+
+class Assistant(object):
+    name = "friday"
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    package = tmp_path / "worker_test_skills"
+    os.mkdir(package)
+    (package / "__init__.py").write_text("")
+    (package / "echo.py").write_text(SKILL)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    # forked workers see the test package
+    monkeypatch.setattr(_workers, "PACKAGE", "worker_test_skills")
+    monkeypatch.setattr(_workers, "CONTEXT", "fork")
+    pool = WorkerPool(size=1)
+    pool.start(["echo"])
+    yield pool
+    pool.start([])
+    while not pool._idle.empty():
+        pool._idle.get().stop()
+
+
+def test_calls_proxy_the_interface(pool):
+    interface = Interface()
+    handler = pool.handler("echo", "echo")
+    pid = handler("hello", interface, Assistant())
+    assert pid != os.getpid()
+    assert interface.outputs == ["hello from friday"]
+    assert pool.preparer("echo", "prepare_echo")("x", Assistant()) == "X"
+    # the worker is reused
+    assert handler("again", interface, Assistant()) == pid
+
+
+def test_errors_keep_the_worker(pool):
+    pid = pool.call("echo", "echo", "a", Interface(), Assistant())
+    with pytest.raises(WorkerError, match="ValueError"):
+        pool.call("echo", "fail", "b", Interface(), Assistant())
+    assert pool.call("echo", "echo", "c", Interface(), Assistant()) == pid
+    assert pool.info()["errors"] == 1
+    assert pool.info()["restarts"] == 0
+
+
+def test_timed_out_call_kills_its_worker(pool):
+    executor = SkillExecutor(max_workers=1, timeout=0.2)
+    pid = pool.call("echo", "echo", "a", Interface(), Assistant())
+    args = ("echo", "hang", "b", Interface(), Assistant())
+    task = executor.submit("echo", pool.call, args, None)
+    with pytest.raises(concurrent.futures.TimeoutError):
+        task.future.result(2)
+    assert task.finished.wait(2)
+    executor.shutdown(wait=False)
+
+    assert pool.info()["restarts"] == 1
+    started = time.monotonic()
+    assert pool.call("echo", "echo", "c", Interface(), Assistant()) != pid
+    assert time.monotonic() - started < 5
+
+
+def test_start_replaces_idle_workers(pool):
+    pid = pool.call("echo", "echo", "a", Interface(), Assistant())
+    pool.start(["echo"])
+    assert pool.call("echo", "echo", "b", Interface(), Assistant()) != pid